@@ -16,12 +16,25 @@ import os
 import json
 import sqlite3
 import hashlib
+import time
+import threading
+import signal
+import socket
+import weakref
 from datetime import datetime
+from collections import ChainMap, OrderedDict, deque
+from html import escape as html_escape
+from urllib.parse import unquote
 from enum import Enum, auto
 from dataclasses import dataclass, field
 from typing import Any, Dict, List, Optional, Union, Callable
 from functools import wraps
 
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
 # ============================================================================
 # الكلمات المفتاحية (Keywords)
 # ============================================================================
@@ -429,33 +442,1247 @@ class Lexer:
 # مكتبة نواة القياسية (Nawa Standard Library)
 # ============================================================================
 
+class Metrics:
+    """📊 المقاييس - Request Metrics
+
+    Per-route request counts, status classes, in-flight gauges and latency
+    histograms with fixed log-scale buckets. Every thread increments its own
+    shard, so recording takes no lock; readers sum the shards.
+    """
+    
+    BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+               0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+    # Layout of a series: in flight, count, sum of seconds, 1xx..5xx, buckets (+Inf last)
+    IN_FLIGHT, COUNT, SUM, STATUS = 0, 1, 2, 3
+    FIRST_BUCKET = 8
+    UNMATCHED = '-'
+    
+    def __init__(self, endpoint=None):
+        self.endpoint = endpoint
+        self.local = threading.local()
+        self.shards = []
+        self.lock = threading.Lock()
+    
+    def enter(self, method, route):
+        """Start timing a request; returns the series to pass to observe()"""
+        shard = getattr(self.local, 'shard', None)
+        if shard is None:
+            shard = self.local.shard = {}
+            with self.lock:
+                self.shards.append(shard)
+        key = (method, route or self.UNMATCHED)
+        series = shard.get(key)
+        if series is None:
+            series = shard[key] = [0] * (self.FIRST_BUCKET + len(self.BUCKETS) + 1)
+        series[self.IN_FLIGHT] += 1
+        return series
+    
+    def observe(self, series, status, seconds):
+        import bisect
+        series[self.IN_FLIGHT] -= 1
+        series[self.COUNT] += 1
+        series[self.SUM] += seconds
+        if 100 <= status < 600:
+            series[self.STATUS + status // 100 - 1] += 1
+        series[self.FIRST_BUCKET + bisect.bisect_left(self.BUCKETS, seconds)] += 1
+    
+    def totals(self):
+        """{(method, route): summed series} across all thread shards"""
+        with self.lock:
+            shards = list(self.shards)
+        totals = {}
+        for shard in shards:
+            for key, series in list(shard.items()):
+                total = totals.get(key)
+                if total is None:
+                    totals[key] = list(series)
+                else:
+                    for i, value in enumerate(series):
+                        total[i] += value
+        return totals
+    
+    def percentile(self, series, q):
+        """Latency in seconds at quantile q (0-1), interpolated within its bucket"""
+        count = series[self.COUNT]
+        if not count:
+            return 0.0
+        rank = q * count
+        cumulative = 0
+        lower = 0.0
+        for i, upper in enumerate(self.BUCKETS + (None,)):
+            in_bucket = series[self.FIRST_BUCKET + i]
+            if in_bucket and cumulative + in_bucket >= rank:
+                if upper is None:
+                    return lower
+                return lower + (upper - lower) * (rank - cumulative) / in_bucket
+            cumulative += in_bucket
+            if upper is not None:
+                lower = upper
+        return lower
+    
+    def snapshot(self, percentiles=(50, 90, 99)):
+        snapshot = {}
+        for (method, route), series in sorted(self.totals().items()):
+            count = series[self.COUNT]
+            entry = {
+                'count': count,
+                'in_flight': series[self.IN_FLIGHT],
+                'status': {f"{i + 1}xx": series[self.STATUS + i] for i in range(5) if series[self.STATUS + i]},
+                'mean_ms': round(series[self.SUM] / count * 1000, 3) if count else 0.0,
+            }
+            for p in percentiles:
+                entry[f"p{p}_ms"] = round(self.percentile(series, p / 100) * 1000, 3)
+            snapshot[f"{method} {route}"] = entry
+        return snapshot
+    
+    @staticmethod
+    def label(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    
+    def exposition(self):
+        """Prometheus text exposition format (version 0.0.4)"""
+        totals = sorted(self.totals().items())
+        lines = [
+            '# HELP nawa_http_requests_total Requests handled, by route and status class.',
+            '# TYPE nawa_http_requests_total counter',
+        ]
+        for (method, route), series in totals:
+            labels = f'method="{method}",route="{self.label(route)}"'
+            for i in range(5):
+                if series[self.STATUS + i]:
+                    lines.append(f'nawa_http_requests_total{{{labels},status="{i + 1}xx"}} {series[self.STATUS + i]}')
+        lines += [
+            '# HELP nawa_http_requests_in_flight Requests currently being handled.',
+            '# TYPE nawa_http_requests_in_flight gauge',
+        ]
+        for (method, route), series in totals:
+            labels = f'method="{method}",route="{self.label(route)}"'
+            lines.append(f'nawa_http_requests_in_flight{{{labels}}} {series[self.IN_FLIGHT]}')
+        lines += [
+            '# HELP nawa_http_request_duration_seconds Time spent handling requests.',
+            '# TYPE nawa_http_request_duration_seconds histogram',
+        ]
+        for (method, route), series in totals:
+            labels = f'method="{method}",route="{self.label(route)}"'
+            cumulative = 0
+            for i, upper in enumerate(self.BUCKETS):
+                cumulative += series[self.FIRST_BUCKET + i]
+                lines.append(f'nawa_http_request_duration_seconds_bucket{{{labels},le="{upper}"}} {cumulative}')
+            lines.append(f'nawa_http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {series[self.COUNT]}')
+            lines.append(f'nawa_http_request_duration_seconds_sum{{{labels}}} {series[self.SUM]:.6f}')
+            lines.append(f'nawa_http_request_duration_seconds_count{{{labels}}} {series[self.COUNT]}')
+        return '\n'.join(lines) + '\n'
+    
+    def response(self):
+        return 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}, self.exposition().encode('utf-8')
+
+class AccessLog:
+    """📝 سجل الوصول - Access Log
+
+    Request threads only append a tuple to an in-memory ring buffer; a
+    background thread formats and writes the entries in batches. When the
+    buffer is full new entries are dropped and counted instead of blocking
+    the request. Entries are text lines or JSON lines, written to stdout or
+    to a file rotated by size.
+    """
+    
+    FORMATS = ('text', 'json')
+    
+    def __init__(self, path=None, format='text', max_size=10 * 1024 * 1024, backups=3,
+                 capacity=8192, flush_interval=0.5):
+        if format not in self.FORMATS:
+            raise ValueError(f"صيغة سجل غير معروفة: {format} (المتاح: {', '.join(self.FORMATS)})")
+        self.path = path
+        self.format = format
+        self.max_size = max_size
+        self.backups = backups
+        self.capacity = capacity
+        self.flush_interval = flush_interval
+        self.buffer = deque()
+        self.written = 0
+        self.dropped = 0
+        self.file = None
+        self.wakeup = threading.Event()
+        self.lock = threading.Lock()
+        self.thread = None
+        self.pid = None
+        self.closed = False
+    
+    def log(self, method, path, status, size, started, client=''):
+        """Record one request; `started` is its time.perf_counter() start"""
+        if len(self.buffer) >= self.capacity:
+            with self.lock:
+                self.dropped += 1
+            return
+        self.buffer.append((time.time(), method, path, status, size,
+                            int((time.perf_counter() - started) * 1e6), client))
+        if self.pid != os.getpid() or self.closed:
+            self.start()
+        elif len(self.buffer) >= self.capacity // 2:
+            self.wakeup.set()
+    
+    def start(self):
+        # Threads do not survive fork, so each pre-fork worker starts its own writer;
+        # a log closed by a previous serve() starts a new one too
+        with self.lock:
+            if self.pid == os.getpid() and not self.closed:
+                return
+            self.pid = os.getpid()
+            self.closed = False
+            self.file = None
+            self.thread = threading.Thread(target=self._run, name='nawa-access-log', daemon=True)
+            self.thread.start()
+    
+    def _run(self):
+        while not self.closed:
+            self.wakeup.wait(self.flush_interval)
+            self.wakeup.clear()
+            self.flush()
+    
+    def format_entry(self, entry):
+        timestamp, method, path, status, size, micros, client = entry
+        if self.format == 'json':
+            return json.dumps({
+                'time': datetime.fromtimestamp(timestamp).isoformat(timespec='milliseconds'),
+                'method': method, 'path': path, 'status': status,
+                'bytes': size, 'us': micros, 'client': client,
+            }, ensure_ascii=False) + '\n'
+        return f"[Nawa Web] {method} {path} {status} {size}B {micros}µs\n"
+    
+    def flush(self):
+        batch = []
+        buffer = self.buffer
+        for _ in range(len(buffer)):
+            batch.append(buffer.popleft())
+        if not batch:
+            return
+        if self.path is None:
+            sys.stdout.write(''.join(self.format_entry(entry) for entry in batch))
+            sys.stdout.flush()
+        else:
+            if self.file is None:
+                self.file = open(self.path, 'ab')
+            pending = []
+            size = self.file.tell()
+            for entry in batch:
+                line = self.format_entry(entry).encode('utf-8')
+                if self.max_size and size and size + len(line) > self.max_size:
+                    self.file.write(b''.join(pending))
+                    pending = []
+                    self.rotate()
+                    size = 0
+                pending.append(line)
+                size += len(line)
+            self.file.write(b''.join(pending))
+            self.file.flush()
+        self.written += len(batch)
+    
+    def rotate(self):
+        """app.log -> app.log.1 -> ... -> app.log.<backups>"""
+        self.file.close()
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{i}"):
+                os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+        if self.backups:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self.file = open(self.path, 'ab')
+    
+    def stats(self):
+        return {'written': self.written, 'dropped': self.dropped, 'pending': len(self.buffer)}
+    
+    def close(self):
+        self.closed = True
+        self.wakeup.set()
+        if self.thread is not None and self.pid == os.getpid():
+            self.thread.join(timeout=2)
+        self.flush()
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+class WorkerPool:
+    """👷 مجمع عمال محدود - Bounded Worker Pool
+
+    A fixed number of threads consume tasks from a bounded queue. When the
+    queue is full `submit` returns False immediately so the caller can shed
+    load instead of piling up work.
+    """
+    
+    def __init__(self, workers, queue_size):
+        import queue
+        self.workers = workers
+        self.queue_size = queue_size
+        self.tasks = queue.Queue(maxsize=queue_size)
+        self.active = 0
+        self.completed = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+        self._threads = []
+        for i in range(workers):
+            thread = threading.Thread(target=self._work, name=f"nawa-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+    
+    def submit(self, func, *args):
+        import queue
+        try:
+            self.tasks.put_nowait((func, args))
+            return True
+        except queue.Full:
+            with self._lock:
+                self.rejected += 1
+            return False
+    
+    def _work(self):
+        while True:
+            task = self.tasks.get()
+            if task is None:
+                break
+            func, args = task
+            with self._lock:
+                self.active += 1
+            try:
+                func(*args)
+            except Exception as e:
+                print(f"[Nawa Worker] {e}")
+            finally:
+                with self._lock:
+                    self.active -= 1
+                    self.completed += 1
+    
+    def stats(self):
+        return {
+            'workers': self.workers,
+            'queue_size': self.queue_size,
+            'queued': self.tasks.qsize(),
+            'active': self.active,
+            'completed': self.completed,
+            'rejected': self.rejected,
+        }
+    
+    def shutdown(self):
+        for _ in self._threads:
+            self.tasks.put(None)
+        for thread in self._threads:
+            thread.join(timeout=5)
+
+class Router:
+    """🧭 موجه المسارات - Trie Router
+
+    Routes are stored in a trie keyed by path segment, so a lookup costs one
+    dict probe per segment no matter how many routes are registered.
+
+        /users/:id        parameter segment   -> {'id': '42'}
+        /files/*path      wildcard (rest)     -> {'path': 'a/b.txt'}
+
+    Static segments win over parameters, which win over wildcards.
+    """
+    
+    ANY = '*'
+    
+    class Node:
+        __slots__ = ('static', 'param', 'param_name', 'wildcard', 'wildcard_name', 'handlers')
+        
+        def __init__(self):
+            self.static = {}
+            self.param = None
+            self.param_name = None
+            self.wildcard = None
+            self.wildcard_name = None
+            self.handlers = None
+    
+    def __init__(self):
+        self.root = self.Node()
+        self.size = 0
+    
+    @staticmethod
+    def split(path):
+        return [unquote(segment) for segment in path.split('/') if segment]
+    
+    def add(self, method, path, route):
+        node = self.root
+        for segment in self.split(path):
+            if segment.startswith(':'):
+                if node.param is None:
+                    node.param = self.Node()
+                    node.param_name = segment[1:]
+                elif node.param_name != segment[1:]:
+                    raise ValueError(f"تعارض في اسم المعامل في المسار {path}: "
+                                     f":{node.param_name} و {segment}")
+                node = node.param
+            elif segment.startswith('*'):
+                if node.wildcard is None:
+                    node.wildcard = self.Node()
+                node.wildcard_name = segment[1:] or '*'
+                node = node.wildcard
+                break
+            else:
+                node = node.static.setdefault(segment, self.Node())
+        if node.handlers is None:
+            node.handlers = {}
+        if method.upper() not in node.handlers:
+            self.size += 1
+        node.handlers[method.upper()] = route
+    
+    def find(self, node, segments, index, params):
+        if index == len(segments):
+            if node.handlers is not None:
+                return node
+            if node.wildcard is not None and node.wildcard.handlers is not None:
+                params[node.wildcard_name] = ''
+                return node.wildcard
+            return None
+        
+        segment = segments[index]
+        child = node.static.get(segment)
+        if child is not None:
+            found = self.find(child, segments, index + 1, params)
+            if found is not None:
+                return found
+        if node.param is not None:
+            params[node.param_name] = segment
+            found = self.find(node.param, segments, index + 1, params)
+            if found is not None:
+                return found
+            del params[node.param_name]
+        if node.wildcard is not None and node.wildcard.handlers is not None:
+            params[node.wildcard_name] = '/'.join(segments[index:])
+            return node.wildcard
+        return None
+    
+    def match(self, method, path):
+        """Return (route, params, allowed_methods); route is None on 404/405"""
+        params = {}
+        node = self.find(self.root, self.split(path), 0, params)
+        if node is None:
+            return None, None, None
+        route = node.handlers.get(method) or node.handlers.get(self.ANY)
+        if route is None:
+            return None, params, sorted(node.handlers)
+        return route, params, None
+
+class Route:
+    """مسار مسجل - A registered route and its options"""
+    
+    __slots__ = ('method', 'path', 'handler', 'cache_ttl', 'vary', 'vary_header', 'limiter', 'concurrency')
+    
+    def __init__(self, method, path, handler, cache_ttl=0, vary=None, limiter=None, concurrency=None):
+        self.method = method
+        self.path = path
+        self.handler = handler
+        self.cache_ttl = cache_ttl
+        self.vary = tuple(h.lower() for h in (vary or ()))
+        self.vary_header = ', '.join(vary or ())
+        # Shared by the Route objects of every method registered together
+        self.limiter = limiter
+        self.concurrency = concurrency
+
+class RateLimiter:
+    """🚦 محدد المعدل - Token-Bucket Rate Limiter
+
+    Each client IP (or a single shared key) gets a bucket of `burst` tokens
+    refilled at `rate` tokens per second. Buckets are kept in an OrderedDict
+    in LRU order, so lookups are O(1) and idle buckets are evicted from the
+    cold end once they would have refilled completely.
+    """
+    
+    def __init__(self, rate, burst=None, per_ip=True, max_buckets=10000):
+        self.rate = float(rate)
+        self.burst = float(burst or max(1.0, self.rate))
+        self.per_ip = per_ip
+        self.max_buckets = max_buckets
+        # An untouched bucket is full again after this long, same as a new one
+        self.idle = self.burst / self.rate
+        self.buckets = OrderedDict()
+        self.lock = threading.Lock()
+        self.rejected = 0
+    
+    def acquire(self, client=None):
+        """Take a token; returns 0 if allowed, else seconds until one is available"""
+        key = client if self.per_ip else None
+        now = time.monotonic()
+        with self.lock:
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                bucket = self.buckets[key] = [self.burst, now]
+                self.evict(now)
+            else:
+                self.buckets.move_to_end(key)
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return 0
+            self.rejected += 1
+            return (1 - bucket[0]) / self.rate
+    
+    def evict(self, now):
+        buckets = self.buckets
+        while len(buckets) > 1:
+            key, (_, last) = next(iter(buckets.items()))
+            if len(buckets) <= self.max_buckets and now - last < self.idle:
+                break
+            del buckets[key]
+    
+    def stats(self):
+        return {'rate': self.rate, 'burst': self.burst, 'buckets': len(self.buckets), 'rejected': self.rejected}
+
+class ResponseCache:
+    """🗃️ ذاكرة الاستجابات - Response Cache
+
+    Stores final encoded responses in a bounded LRU with a per-entry TTL.
+    Entries are keyed by path, query string and the values of the route's
+    `vary` request headers. Paths are percent-decoded per segment, as the
+    Router matches them, so every spelling of a path shares one entry and
+    invalidate('/مقالات/1') finds it.
+    """
+    
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expired = 0
+    
+    @staticmethod
+    def normalize(path):
+        # An encoded '/' stays encoded: it is part of its segment, not a separator
+        return '/'.join(unquote(segment).replace('/', '%2F') for segment in path.split('/'))
+    
+    @classmethod
+    def key(cls, path, query, vary, headers):
+        varied = tuple((headers.get(name) or '') for name in vary) if vary and headers else ()
+        return (cls.normalize(path), query, varied)
+    
+    def get(self, key):
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry['expires'] <= now:
+                del self.entries[key]
+                self.expired += 1
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+    
+    def put(self, key, route, response, ttl):
+        status, headers, body = response
+        entry = {
+            'route': route.path,
+            'status': status,
+            'headers': headers,
+            'body': body,
+            'encoded': {},
+            'expires': time.monotonic() + ttl,
+        }
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+        return entry
+    
+    def clear(self):
+        """Drop every entry; returns how many there were"""
+        with self.lock:
+            removed = len(self.entries)
+            self.entries.clear()
+            return removed
+    
+    def invalidate(self, path=None):
+        """Drop entries for a request path or route pattern (everything if None)"""
+        if path is None:
+            return self.clear()
+        decoded = self.normalize(path)
+        with self.lock:
+            stale = [key for key, entry in self.entries.items()
+                     if key[0] == decoded or entry['route'] == path]
+            for key in stale:
+                del self.entries[key]
+            return len(stale)
+    
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self.entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0,
+                'evictions': self.evictions,
+                'expired': self.expired,
+            }
+
+def process_memory():
+    """Resident memory of this process in MB; the peak where the current size is unknown"""
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') // (1024 * 1024)
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    if resource is None:
+        return 0
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // (1024 * 1024) if sys.platform == 'darwin' else peak // 1024
+
+def iterate(source):
+    """Items of an iterable, or of a page function called with 0, 1, 2...
+
+    Nawa has no generators, so Nawa code produces long sequences with a
+    function returning one page (a list or a single item) per call, and
+    null or an empty list when done.
+    """
+    if not callable(source):
+        yield from source
+        return
+    paged = WebServer.handler_arity(source) != 0
+    page = 0
+    while True:
+        result = source(page) if paged else source()
+        if result is None or result == '' or result == []:
+            return
+        if isinstance(result, list):
+            yield from result
+        else:
+            yield result
+        page += 1
+
+class PayloadTooLarge(Exception):
+    """Request body larger than the server's max_body_size"""
+
+class UploadedFile:
+    """📎 ملف مرفوع - Uploaded File
+
+    One file part of a multipart body. The content stays in a spooled
+    temporary file, so large uploads are on disk rather than in memory.
+    """
+    
+    def __init__(self, field, filename, content_type, file, size):
+        self.field = field
+        self.filename = filename
+        self.content_type = content_type
+        self.file = file
+        self.size = size
+    
+    def read(self):
+        self.file.seek(0)
+        return self.file.read()
+    
+    def save(self, path):
+        import shutil
+        self.file.seek(0)
+        with open(path, 'wb') as out:
+            shutil.copyfileobj(self.file, out)
+        return path
+    
+    def close(self):
+        self.file.close()
+    
+    def احفظ(self, path):
+        return self.save(path)
+    
+    اسم_الملف = property(lambda self: self.filename)
+    نوع = property(lambda self: self.content_type)
+    حجم = property(lambda self: self.size)
+
+class lazy_property:
+    """Attribute computed on first access, then stored on the instance.
+
+    The same as functools.cached_property, which needs Python 3.8.
+    """
+    
+    def __init__(self, func):
+        self.func = func
+        self.__doc__ = func.__doc__
+    
+    def __set_name__(self, owner, name):
+        self.name = name
+    
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        value = instance.__dict__[self.name] = self.func(instance)
+        return value
+
+class Request:
+    """📨 الطلب - HTTP Request
+
+    Available to route handlers through الطلب_الحالي(). Query string,
+    JSON, form and multipart bodies are parsed on first access; bodies
+    larger than the server's spool size arrive in a temporary file.
+    """
+    
+    READ_SIZE = 64 * 1024
+    
+    def __init__(self, method, path, query_string='', headers=None, body=None, spool_size=1024 * 1024):
+        self.method = method
+        self.path = path
+        self.query_string = query_string
+        self.raw_headers = headers
+        self.spool_size = spool_size
+        # bytes, a file object positioned anywhere, or None
+        self.stream = body.encode('utf-8') if isinstance(body, str) else body
+    
+    def header(self, name, default=None):
+        value = self.raw_headers.get(name.lower()) if self.raw_headers else None
+        return default if value is None else value
+    
+    @lazy_property
+    def headers(self):
+        return {key.lower(): value for key, value in (self.raw_headers or {}).items()}
+    
+    @lazy_property
+    def content_type(self):
+        return self.header('content-type', '').split(';')[0].strip().lower()
+    
+    @staticmethod
+    def flatten(parsed):
+        """parse_qs output with single values unwrapped"""
+        return {key: values[0] if len(values) == 1 else values for key, values in parsed.items()}
+    
+    @lazy_property
+    def query(self):
+        from urllib.parse import parse_qs
+        return self.flatten(parse_qs(self.query_string, keep_blank_values=True))
+    
+    @lazy_property
+    def body(self):
+        if self.stream is None:
+            return b''
+        if isinstance(self.stream, bytes):
+            return self.stream
+        self.stream.seek(0)
+        return self.stream.read()
+    
+    @lazy_property
+    def text(self):
+        return self.body.decode('utf-8', 'replace')
+    
+    @lazy_property
+    def json(self):
+        return json.loads(self.text) if self.body else None
+    
+    @lazy_property
+    def form(self):
+        if self.content_type == 'application/x-www-form-urlencoded':
+            from urllib.parse import parse_qs
+            return self.flatten(parse_qs(self.text, keep_blank_values=True))
+        if self.content_type == 'multipart/form-data':
+            return self.multipart[0]
+        return {}
+    
+    @lazy_property
+    def files(self):
+        return self.multipart[1] if self.content_type == 'multipart/form-data' else {}
+    
+    @staticmethod
+    def header_params(name, value):
+        from email.message import Message
+        message = Message()
+        message[name] = value
+        return message
+    
+    @lazy_property
+    def multipart(self):
+        """(fields, files) parsed line by line from the body stream"""
+        import io
+        import tempfile
+        boundary = self.header_params('content-type', self.header('content-type', '')).get_param('boundary')
+        fields, files = {}, {}
+        if not boundary or self.stream is None:
+            return fields, files
+        delimiter = b'--' + boundary.encode('latin-1')
+        stream = io.BytesIO(self.stream) if isinstance(self.stream, bytes) else self.stream
+        stream.seek(0)
+        
+        line = stream.readline(self.READ_SIZE)
+        while line and line.rstrip(b'\r\n') != delimiter:
+            line = stream.readline(self.READ_SIZE)
+        finished = not line
+        while not finished:
+            part_headers = {}
+            while True:
+                line = stream.readline(self.READ_SIZE)
+                if not line or line in (b'\r\n', b'\n'):
+                    break
+                key, _, value = line.decode('utf-8', 'replace').partition(':')
+                part_headers[key.strip().lower()] = value.strip()
+            
+            disposition = self.header_params('content-disposition', part_headers.get('content-disposition', ''))
+            name = disposition.get_param('name', header='content-disposition')
+            filename = disposition.get_param('filename', header='content-disposition')
+            target = tempfile.SpooledTemporaryFile(self.spool_size) if filename is not None else io.BytesIO()
+            
+            # The line break before a delimiter belongs to the delimiter
+            pending = b''
+            while True:
+                line = stream.readline(self.READ_SIZE)
+                if not line:
+                    finished = True
+                    break
+                if line.startswith(b'--'):
+                    marker = line.rstrip(b'\r\n')
+                    if marker == delimiter:
+                        break
+                    if marker == delimiter + b'--':
+                        finished = True
+                        break
+                target.write(pending)
+                if line.endswith(b'\r\n'):
+                    pending, line = b'\r\n', line[:-2]
+                elif line.endswith(b'\n'):
+                    pending, line = b'\n', line[:-1]
+                else:
+                    pending = b''
+                target.write(line)
+            
+            if name is None:
+                continue
+            if filename is not None:
+                size = target.tell()
+                target.seek(0)
+                files[name] = UploadedFile(name, filename, part_headers.get('content-type',
+                                           'application/octet-stream'), target, size)
+            else:
+                fields[name] = target.getvalue().decode('utf-8', 'replace')
+        return fields, files
+    
+    def close(self):
+        if 'multipart' in self.__dict__:
+            for upload in self.multipart[1].values():
+                upload.close()
+        if self.stream is not None and not isinstance(self.stream, bytes):
+            self.stream.close()
+    
+    def ترويسة(self, name, default=None):
+        return self.header(name, default)
+    
+    طريقة = property(lambda self: self.method)
+    مسار = property(lambda self: self.path)
+    استعلام = property(lambda self: self.query)
+    ترويسات = property(lambda self: self.headers)
+    جسون = property(lambda self: self.json)
+    نموذج = property(lambda self: self.form)
+    ملفات = property(lambda self: self.files)
+    نص_الجسم = property(lambda self: self.text)
+
+class FileBody:
+    """جسم استجابة من ملف - Response body streamed from a file
+
+    Engines send it with sendfile (or chunked reads) instead of loading the
+    file into memory.
+    """
+    
+    CHUNK_SIZE = 256 * 1024
+    
+    def __init__(self, path, offset, length):
+        self.path = path
+        self.offset = offset
+        self.length = length
+    
+    def __len__(self):
+        return self.length
+    
+    def send_to(self, sock):
+        """Blocking send over a socket, zero-copy where the OS supports it"""
+        with open(self.path, 'rb') as f:
+            if self.length:
+                sock.sendfile(f, self.offset, self.length)
+    
+    def chunks(self):
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+            remaining = self.length
+            while remaining > 0:
+                chunk = f.read(min(self.CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+class StreamBody:
+    """جسم استجابة متدفق - Streamed response body
+
+    Wraps an iterator, a file object, or a function called for successive
+    pages (with the page number when it takes an argument) until it returns
+    null or an empty list. Engines send the chunks with chunked transfer
+    encoding as they are produced; small items are coalesced up to
+    CHUNK_SIZE, except for Server-Sent Events which flush per event.
+    """
+    
+    CHUNK_SIZE = 16 * 1024
+    
+    def __init__(self, source, events=False):
+        self.source = source
+        self.events = events
+        self.on_close = []  # callbacks run once, when the response is finished
+    
+    def items(self):
+        source = self.source
+        if hasattr(source, 'read'):
+            while True:
+                data = source.read(self.CHUNK_SIZE)
+                if not data:
+                    return
+                yield data
+        else:
+            yield from iterate(source)
+    
+    @staticmethod
+    def to_bytes(item):
+        if isinstance(item, bytes):
+            return item
+        if isinstance(item, (dict, list)):
+            return (json.dumps(item, ensure_ascii=False) + '\n').encode('utf-8')
+        return str(item).encode('utf-8')
+    
+    @staticmethod
+    def format_event(item):
+        """One SSE frame; dicts with a `data` key may also set event, id and retry"""
+        fields = []
+        if isinstance(item, dict) and 'data' in item:
+            for name in ('event', 'id', 'retry'):
+                if item.get(name) is not None:
+                    fields.append(f"{name}: {item[name]}")
+            item = item['data']
+        if isinstance(item, bytes):
+            item = item.decode('utf-8')
+        elif isinstance(item, (dict, list)):
+            item = json.dumps(item, ensure_ascii=False)
+        fields.extend(f"data: {line}" for line in str(item).split('\n'))
+        return ('\n'.join(fields) + '\n\n').encode('utf-8')
+    
+    def __iter__(self):
+        if self.events:
+            for item in self.items():
+                yield self.format_event(item)
+            return
+        buffer = []
+        size = 0
+        for item in self.items():
+            data = self.to_bytes(item)
+            buffer.append(data)
+            size += len(data)
+            if size >= self.CHUNK_SIZE:
+                yield b''.join(buffer)
+                buffer = []
+                size = 0
+        if size:
+            yield b''.join(buffer)
+    
+    def close(self):
+        callbacks, self.on_close = self.on_close, []
+        try:
+            close = getattr(self.source, 'close', None)
+            if close is not None:
+                close()
+        finally:
+            for callback in callbacks:
+                callback()
+
+class StaticFiles:
+    """📦 الملفات الثابتة - Static Files
+
+    Serves files under a directory without letting paths escape it. Stat
+    results and MIME types are cached (stats for STAT_TTL seconds) so hot
+    files cost no syscalls, and Range requests are answered with 206.
+    """
+    
+    STAT_TTL = 1.0
+    MAX_ENTRIES = 4096
+    INDEX = 'index.html'
+    
+    def __init__(self, prefix, directory):
+        self.prefix = '/' + prefix.strip('/')
+        self.directory = directory
+        self.root = os.path.realpath(directory)
+        self.entries = OrderedDict()
+        self.mime_types = {}
+        self.lock = threading.Lock()
+    
+    def mime_type(self, path):
+        ext = os.path.splitext(path)[1].lower()
+        mime = self.mime_types.get(ext)
+        if mime is None:
+            import mimetypes
+            mime = mimetypes.guess_type('file' + ext)[0] or 'application/octet-stream'
+            if mime.startswith('text/') or mime in ('application/javascript', 'application/json'):
+                mime += '; charset=utf-8'
+            self.mime_types[ext] = mime
+        return mime
+    
+    def resolve(self, relative):
+        """Absolute path inside the root for a URL path, or None"""
+        relative = unquote(relative)
+        if '\0' in relative:
+            return None
+        full = os.path.realpath(os.path.join(self.root, relative.lstrip('/')))
+        if full != self.root and not full.startswith(self.root + os.sep):
+            return None
+        if os.path.isdir(full):
+            full = os.path.join(full, self.INDEX)
+        return full
+    
+    def lookup(self, relative):
+        now = time.monotonic()
+        with self.lock:
+            info = self.entries.get(relative)
+            if info is not None and now - info['checked'] < self.STAT_TTL:
+                self.entries.move_to_end(relative)
+                return info['file']
+        
+        path = self.resolve(relative)
+        file_info = None
+        if path is not None:
+            try:
+                st = os.stat(path)
+            except OSError:
+                st = None
+            if st is not None and not os.path.isdir(path):
+                file_info = {
+                    'path': path,
+                    'size': st.st_size,
+                    'mtime': int(st.st_mtime),
+                    'etag': f'"{st.st_mtime_ns:x}-{st.st_size:x}"',
+                    'type': self.mime_type(path),
+                }
+        
+        with self.lock:
+            self.entries[relative] = {'checked': now, 'file': file_info}
+            self.entries.move_to_end(relative)
+            while len(self.entries) > self.MAX_ENTRIES:
+                self.entries.popitem(last=False)
+        return file_info
+    
+    @staticmethod
+    def parse_range(value, size):
+        """(start, end) for a single `bytes=` range, None to ignore, False if unsatisfiable"""
+        if not value or not value.startswith('bytes=') or ',' in value:
+            return None
+        start, sep, end = value[6:].strip().partition('-')
+        if not sep:
+            return None
+        try:
+            if start == '':
+                length = int(end)
+                if length <= 0:
+                    return False
+                return max(0, size - length), size - 1
+            first = int(start)
+            last = int(end) if end else size - 1
+        except ValueError:
+            return None
+        if first >= size or last < first:
+            return False
+        return first, min(last, size - 1)
+    
+    def respond(self, server, relative, request_headers):
+        info = self.lookup(relative)
+        if info is None:
+            return 404, {'Content-Type': 'text/plain; charset=utf-8'}, b'404 - Page Not Found'
+        
+        headers = {
+            'Content-Type': info['type'],
+            'ETag': info['etag'],
+            'Last-Modified': server.http_date(info['mtime']),
+            'Accept-Ranges': 'bytes',
+        }
+        if server.not_modified(request_headers, info['etag'], info['mtime']):
+            return 304, {k: headers[k] for k in ('ETag', 'Last-Modified')}, b''
+        
+        size = info['size']
+        byte_range = None
+        if request_headers:
+            byte_range = self.parse_range(request_headers.get('range'), size)
+            if_range = request_headers.get('if-range')
+            if byte_range and if_range and if_range not in (info['etag'], headers['Last-Modified']):
+                byte_range = None
+        if byte_range is False:
+            return 416, {'Content-Range': f"bytes */{size}"}, b''
+        if byte_range:
+            start, end = byte_range
+            headers['Content-Range'] = f"bytes {start}-{end}/{size}"
+            return 206, headers, FileBody(info['path'], start, end - start + 1)
+        return 200, headers, FileBody(info['path'], 0, size)
+
 class WebServer:
     """🌐 خادم ويب بسيط - Simple Web Server"""
     
-    def __init__(self, port=8080):
+    SERVICE_UNAVAILABLE = (
+        b'HTTP/1.1 503 Service Unavailable\r\n'
+        b'Content-Type: text/plain; charset=utf-8\r\n'
+        b'Content-Length: 27\r\n'
+        b'Retry-After: 1\r\n'
+        b'Connection: close\r\n\r\n'
+        b'503 - Service Unavailable\r\n'
+    )
+    
+    ENGINES = ('threads', 'asyncio')
+    
+    # Live servers, so HotReloader can find their route handlers
+    instances = weakref.WeakSet()
+    
+    # The request being handled on this thread (see current_request)
+    local = threading.local()
+    
+    def __init__(self, port=8080, workers=0, queue_size=0, host='localhost', engine='threads'):
+        if engine not in self.ENGINES:
+            raise ValueError(f"محرك غير معروف: {engine} (المتاح: {', '.join(self.ENGINES)})")
         self.port = port
+        self.host = host
+        self.engine = engine
         self.routes = {}
+        self.router = Router()
+        self.cache = ResponseCache()
         self.static_dir = './static'
+        self.static_files = None  # mounted by static()
+        self.workers = workers
+        self.queue_size = queue_size or workers * 8
+        self.pool = None
+        self.etags = True
+        self.compression()
+        self.body_limits()
+        self.access_log = AccessLog()
+        self.metrics = Metrics()
+        self.limiter = None
+        self.runner = None
+        self.listen_socket = None
+        self.banner = True
+        WebServer.instances.add(self)
+        
+    def route(self, path, handler=None, methods=None, cache_ttl=0, vary=None,
+              rate=None, burst=None, per_ip=True, max_concurrent=0):
+        """Register a handler; `path` may contain `:param` and `*wildcard` segments.
+
+        With `cache_ttl` (seconds) successful GET responses are cached, keyed
+        by path, query string and the request headers named in `vary`.
+        `rate` (requests per second, bursts of `burst`) answers 429 past the
+        limit, per client IP unless `per_ip` is false; `max_concurrent`
+        answers 503 while that many requests are already running. Both are
+        checked before the handler runs.
+        """
+        if handler is None:
+            def decorator(func):
+                self.route(path, func, methods, cache_ttl, vary, rate, burst, per_ip, max_concurrent)
+                return func
+            return decorator
         
-    def route(self, path):
-        def decorator(func):
-            self.routes[path] = func
-            return func
-        return decorator
+        if isinstance(methods, str):
+            methods = [methods]
+        if isinstance(vary, str):
+            vary = [vary]
+        limiter = RateLimiter(rate, burst, per_ip) if rate else None
+        concurrency = threading.BoundedSemaphore(max_concurrent) if max_concurrent else None
+        for method in methods or [Router.ANY]:
+            route = Route(method.upper(), path, handler, cache_ttl, vary, limiter, concurrency)
+            self.routes[(route.method, path)] = route
+            self.router.add(route.method, path, route)
+        return handler
     
-    def html(self, content):
-        return {
-            'type': 'html',
-            'content': content,
-            'headers': {'Content-Type': 'text/html; charset=utf-8'}
-        }
+    def اربط(self, path, handler, طرق=None, مدة_التخزين=0, تنويع=None,
+             معدل=None, دفعة=None, لكل_عنوان=True, حد_التزامن=0):
+        return self.route(path, handler, طرق, مدة_التخزين, تنويع, معدل, دفعة, لكل_عنوان, حد_التزامن)
     
-    def json_response(self, data):
-        return {
-            'type': 'json',
-            'content': json.dumps(data, ensure_ascii=False),
-            'headers': {'Content-Type': 'application/json; charset=utf-8'}
-        }
+    def رابط(self, path, handler, طرق=None, مدة_التخزين=0, تنويع=None,
+             معدل=None, دفعة=None, لكل_عنوان=True, حد_التزامن=0):
+        return self.route(path, handler, طرق, مدة_التخزين, تنويع, معدل, دفعة, لكل_عنوان, حد_التزامن)
+    
+    def rate_limit(self, rate, burst=None, per_ip=True):
+        """Token-bucket limit applied to every request, static files included"""
+        self.limiter = RateLimiter(rate, burst, per_ip) if rate else None
+    
+    def حد_المعدل(self, معدل, دفعة=None, لكل_عنوان=True):
+        self.rate_limit(معدل, دفعة, لكل_عنوان)
+    
+    @staticmethod
+    def too_many_requests(wait):
+        import math
+        return 429, {'Content-Type': 'text/plain; charset=utf-8',
+                     'Retry-After': str(math.ceil(wait))}, b'429 - Too Many Requests'
+    
+    def static(self, prefix='/static', directory='./static'):
+        """Serve files under `directory` at URLs starting with `prefix` (routes still match first)"""
+        self.static_dir = directory
+        self.static_files = StaticFiles(prefix, directory)
+    
+    def ملفات_ثابتة(self, prefix='/static', directory='./static'):
+        self.static(prefix, directory)
+    
+    def match(self, path, method='GET'):
+        """Look up a path; returns {'params': ...} or None"""
+        route, params, _ = self.router.match(method.upper(), path)
+        return None if route is None else {'params': params}
+    
+    def طابق(self, path, طريقة='GET'):
+        return self.match(path, طريقة)
+    
+    @staticmethod
+    def handler_arity(handler):
+        arity = getattr(handler, 'arity', None)
+        if arity is not None:
+            return arity
+        import inspect
+        try:
+            parameters = inspect.signature(handler).parameters.values()
+        except (TypeError, ValueError):
+            return None
+        if any(p.kind == p.VAR_POSITIONAL for p in parameters):
+            return None
+        return sum(1 for p in parameters if p.kind in (p.POSITIONAL_ONLY, p.POSITIONAL_OR_KEYWORD))
+    
+    def call_handler(self, handler, args):
+        arity = self.handler_arity(handler)
+        return handler(*(args if arity is None else args[:arity]))
+    
+    def html(self, content, version=None, last_modified=None):
+        return self.make_response('html', content, version, last_modified)
+    
+    @staticmethod
+    def make_response(kind, content, version=None, last_modified=None):
+        """Response dict; `version` is used as the ETag instead of hashing the body"""
+        if kind == 'json':
+            content = json.dumps(content, ensure_ascii=False)
+            content_type = 'application/json; charset=utf-8'
+        else:
+            content_type = 'text/html; charset=utf-8'
+        response = {'type': kind, 'content': content, 'headers': {'Content-Type': content_type}}
+        if version is not None:
+            response['etag'] = version
+        if last_modified is not None:
+            response['last_modified'] = last_modified
+        return response
+    
+    def render(self, template, context=None):
+        """Render a compiled template (or template text) as an HTML response"""
+        return self.html(Template.render_text(template, context))
+    
+    def json_response(self, data, version=None, last_modified=None):
+        return self.make_response('json', data, version, last_modified)
+    
+    @staticmethod
+    def stream_response(source, content_type='text/plain; charset=utf-8'):
+        """Response sent with chunked encoding while `source` produces it"""
+        return {'type': 'stream', 'stream': source, 'headers': {'Content-Type': content_type}}
+    
+    @staticmethod
+    def events_response(source):
+        """Server-Sent Events: each item of `source` becomes one event"""
+        return {'type': 'events', 'stream': source,
+                'headers': {'Content-Type': 'text/event-stream; charset=utf-8',
+                            'Cache-Control': 'no-cache'}}
     
     def redirect(self, url):
         return {
@@ -464,115 +1691,1708 @@ class WebServer:
             'headers': {'Location': url}
         }
     
-    def serve(self):
-        from http.server import HTTPServer, BaseHTTPRequestHandler
+    def admit(self, method, path, client=None):
+        """Apply the rate and concurrency limits before a request body is read.
+
+        Returns (rejection, slot): a 429/503 response or None, and the
+        route's concurrency semaphore if one was taken. Pass the pair to
+        dispatch(), which releases the slot once the response (or its
+        stream) is finished; release() it if the request ends before that.
+        """
+        route = self.router.match(method, path.partition('?')[0])[0]
+        return self.check_limits(route, client)
+    
+    @staticmethod
+    def release(admission):
+        if admission is not None and admission[1] is not None:
+            admission[1].release()
+    
+    def check_limits(self, route, client):
+        # Limits are checked before any Nawa code runs
+        if self.limiter is not None:
+            wait = self.limiter.acquire(client)
+            if wait:
+                return self.too_many_requests(wait), None
+        if route is None:
+            return None, None
+        if route.limiter is not None:
+            wait = route.limiter.acquire(client)
+            if wait:
+                return self.too_many_requests(wait), None
+        if route.concurrency is not None:
+            if not route.concurrency.acquire(blocking=False):
+                return (503, {'Content-Type': 'text/plain; charset=utf-8', 'Retry-After': '1'},
+                        b'503 - Service Unavailable'), None
+            return None, route.concurrency
+        return None, None
+    
+    def dispatch(self, method, path, body=None, headers=None, client=None, admission=None):
+        """Run the route handler for a request and return (status, headers, body bytes)
+
+        `admission` is the result of admit() when the engine applied the
+        limits before reading the body; otherwise they are applied here.
+        """
+        path, _, query = path.partition('?')
+        metrics = self.metrics
+        if path == metrics.endpoint and method in ('GET', 'HEAD'):
+            return metrics.response()
+        
+        started = time.perf_counter()
+        route, params, allowed = self.router.match(method, path)
+        label = route.path if route is not None else None
+        static = self.static_files
+        if (route is None and static is not None and method in ('GET', 'HEAD')
+                and path.startswith(static.prefix + '/')):
+            label = static.prefix + '/*'
+        series = metrics.enter(method, label)
+        status = 500
+        slot = None
+        try:
+            rejection, slot = admission or self.check_limits(route, client)
+            if rejection is not None:
+                response = rejection
+            elif route is None and label is not None:
+                response = static.respond(self, path[len(static.prefix):], headers)
+            else:
+                response = self.handle_route(method, path, query, body, headers, route, params, allowed)
+            status = response[0]
+            # A streamed response keeps its concurrency slot until it is sent
+            if slot is not None and isinstance(response[2], StreamBody):
+                response[2].on_close.append(slot.release)
+                slot = None
+            return response
+        finally:
+            if slot is not None:
+                slot.release()
+            metrics.observe(series, status, time.perf_counter() - started)
+    
+    def handle_route(self, method, path, query, body, headers, route, params, allowed):
+        if route is None:
+            if allowed:
+                return 405, {'Content-Type': 'text/plain; charset=utf-8',
+                             'Allow': ', '.join(allowed)}, b'405 - Method Not Allowed'
+            return 404, {'Content-Type': 'text/plain; charset=utf-8'}, b'404 - Page Not Found'
+        return self.run_route(method, path, query, body, headers, route, params)
+    
+    def run_route(self, method, path, query, body, headers, route, params):
+        cache_key = None
+        if route.cache_ttl and method in ('GET', 'HEAD'):
+            cache_key = self.cache.key(path, query, route.vary, headers)
+            entry = self.cache.get(cache_key)
+            if entry is not None:
+                response = entry['status'], dict(entry['headers'], **{'X-Cache': 'HIT'}), entry['body']
+                return self.encode(headers, self.conditional(headers, response), entry)
+        
+        request = Request(method, path, query, headers, body, self.spool_size)
+        self.local.request = request
+        try:
+            # GET handlers receive (params); others receive (body text, params),
+            # decoded only when the handler takes it
+            if method in ('GET', 'HEAD'):
+                args = [params]
+            else:
+                args = [request.text if self.handler_arity(route.handler) != 0 else None, params]
+            result = self.call_handler(route.handler, args)
+        except Exception as e:
+            print(f"[Nawa Web] خطأ في {path}: {e}")
+            return 500, {'Content-Type': 'text/plain; charset=utf-8'}, b'500 - Internal Server Error'
+        finally:
+            self.local.request = None
+            request.close()
+            # A transaction must not outlive its request: the worker thread would
+            # keep the writer lock, and its next request would join the transaction
+            for db in Database.roll_back_thread():
+                print(f"[Nawa Web] معاملة لم تثبت في {path} على {db.name}، تم التراجع عنها")
+        response = self.build_response(result, getattr(route.handler, 'interpreter', None))
+        if method not in ('GET', 'HEAD') or response[0] != 200 or not isinstance(response[2], bytes):
+            return response
+        
+        if self.etags and 'ETag' not in response[1]:
+            response[1]['ETag'] = self.etag(response[2])
+        entry = None
+        if cache_key is not None:
+            if route.vary:
+                response[1]['Vary'] = route.vary_header
+            entry = self.cache.put(cache_key, route, response, route.cache_ttl)
+            response = response[0], dict(response[1], **{'X-Cache': 'MISS'}), response[2]
+        return self.encode(headers, self.conditional(headers, response), entry)
+    
+    def body_limits(self, max_size=10 * 1024 * 1024, spool_size=1024 * 1024):
+        """Reject bodies above `max_size` with 413; spool those above `spool_size` to disk"""
+        self.max_body_size = max_size
+        self.spool_size = spool_size
+    
+    def اضبط_الجسم(self, حد_اقصى=10 * 1024 * 1024, حد_الذاكرة=1024 * 1024):
+        self.body_limits(حد_اقصى, حد_الذاكرة)
+    
+    def set_access_log(self, path=None, format='text', max_size=10 * 1024 * 1024, backups=3, enabled=True):
+        """Write the access log to `path` (stdout if omitted) as text or JSON lines"""
+        self.access_log = AccessLog(path, format, max_size, backups) if enabled else None
+    
+    def سجل_الوصول(self, مسار=None, صيغة='text', حجم_اقصى=10 * 1024 * 1024, نسخ=3, مفعل=True):
+        self.set_access_log(مسار, صيغة, حجم_اقصى, نسخ, مفعل)
+    
+    def log_request(self, method, path, status, size, started, client=''):
+        if self.access_log is not None:
+            self.access_log.log(method, path, status, size, started, client)
+    
+    def enable_metrics(self, endpoint='/metrics'):
+        """Expose the collected metrics at `endpoint` in Prometheus text format"""
+        self.metrics.endpoint = endpoint
+    
+    def فعل_المقاييس(self, مسار='/metrics'):
+        self.enable_metrics(مسار)
+    
+    def metrics_snapshot(self, percentiles=(50, 90, 99)):
+        return self.metrics.snapshot(percentiles)
+    
+    def مقاييس(self, نسب=(50, 90, 99)):
+        return self.metrics_snapshot(نسب)
+    
+    def read_body(self, stream, length):
+        """Read a Content-Length body: bytes when small, a temporary file otherwise"""
+        if length <= self.spool_size:
+            return stream.read(length) if length else b''
+        import tempfile
+        spool = tempfile.SpooledTemporaryFile(self.spool_size)
+        remaining = length
+        while remaining > 0:
+            chunk = stream.read(min(Request.READ_SIZE, remaining))
+            if not chunk:
+                break
+            spool.write(chunk)
+            remaining -= len(chunk)
+        spool.seek(0)
+        return spool
+    
+    @staticmethod
+    def current_request():
+        return getattr(WebServer.local, 'request', None)
+    
+    COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/javascript',
+                          'application/xml', 'image/svg+xml')
+    
+    def compression(self, enabled=True, min_size=1024, level=6):
+        """Configure negotiated gzip/deflate compression of responses"""
+        self.compress = enabled
+        self.compress_min_size = min_size
+        self.compress_level = level
+    
+    def اضبط_الضغط(self, مفعل=True, حد_ادنى=1024, مستوى=6):
+        self.compression(مفعل, حد_ادنى, مستوى)
+    
+    @staticmethod
+    def negotiate_encoding(request_headers):
+        """Pick gzip or deflate from Accept-Encoding (None for identity)"""
+        accept = request_headers.get('accept-encoding') if request_headers else None
+        if not accept:
+            return None
+        quality = {}
+        for item in accept.split(','):
+            name, _, params = item.strip().partition(';')
+            q = 1.0
+            params = params.strip()
+            if params.startswith('q='):
+                try:
+                    q = float(params[2:])
+                except ValueError:
+                    q = 0.0
+            quality[name.strip().lower()] = q
+        default = quality.get('*', 0.0)
+        gzip_q = quality.get('gzip', default)
+        deflate_q = quality.get('deflate', default)
+        if gzip_q > 0 and gzip_q >= deflate_q:
+            return 'gzip'
+        if deflate_q > 0:
+            return 'deflate'
+        return None
+    
+    def compress_body(self, encoding, body):
+        import zlib
+        if encoding == 'gzip':
+            import gzip
+            return gzip.compress(body, compresslevel=self.compress_level, mtime=0)
+        return zlib.compress(body, self.compress_level)
+    
+    def compressible(self, status, headers, body):
+        return (self.compress and status == 200 and isinstance(body, bytes)
+                and len(body) >= self.compress_min_size
+                and 'Content-Encoding' not in headers
+                and headers.get('Content-Type', '').startswith(self.COMPRESSIBLE_TYPES))
+    
+    @staticmethod
+    def representation(headers, encoding):
+        """Headers naming the representation for `encoding`: Vary and the ETag"""
+        headers = dict(headers)
+        vary = headers.get('Vary')
+        headers['Vary'] = f"{vary}, Accept-Encoding" if vary else 'Accept-Encoding'
+        # Each representation needs its own strong validator
+        etag = headers.get('ETag')
+        if encoding and etag and etag.endswith('"'):
+            headers['ETag'] = f'{etag[:-1]}-{encoding}"'
+        return headers
+    
+    def encode(self, request_headers, response, entry=None):
+        """Compress a response for the client, reusing the cached entry's encodings"""
+        status, headers, body = response
+        if not self.compressible(status, headers, body):
+            return response
+        
+        encoding = self.negotiate_encoding(request_headers)
+        headers = self.representation(headers, encoding)
+        if encoding is None:
+            return status, headers, body
+        
+        encoded = entry['encoded'].get(encoding) if entry is not None else None
+        if encoded is None:
+            encoded = self.compress_body(encoding, body)
+            if entry is not None:
+                entry['encoded'][encoding] = encoded
+        headers['Content-Encoding'] = encoding
+        return status, headers, encoded
+    
+    @staticmethod
+    def etag(body):
+        """Strong validator for a response body"""
+        return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+    
+    @staticmethod
+    def http_date(timestamp):
+        from email.utils import formatdate
+        return formatdate(timestamp, usegmt=True)
+    
+    @staticmethod
+    def to_timestamp(value):
+        if isinstance(value, (int, float)):
+            return value
+        if isinstance(value, datetime):
+            return value.timestamp()
+        return datetime.fromisoformat(str(value)).timestamp()
+    
+    def not_modified(self, request_headers, etag=None, last_modified=None):
+        """True if the client's cached copy (If-None-Match / If-Modified-Since) is current"""
+        if not request_headers:
+            return False
+        if_none_match = request_headers.get('if-none-match')
+        if if_none_match is not None:
+            if etag is None:
+                return False
+            if if_none_match.strip() == '*':
+                return True
+            # Weak comparison, as required for If-None-Match; compressed
+            # representations differ only by an encoding suffix
+            def bare(tag):
+                tag = tag.strip()
+                tag = tag[2:] if tag.startswith('W/') else tag
+                for suffix in ('-gzip"', '-deflate"'):
+                    if tag.endswith(suffix):
+                        return tag[:-len(suffix)] + '"'
+                return tag
+            current = bare(etag)
+            return any(bare(tag) == current for tag in if_none_match.split(','))
+        
+        if_modified_since = request_headers.get('if-modified-since')
+        if if_modified_since and last_modified is not None:
+            from email.utils import parsedate_to_datetime
+            try:
+                since = parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError, IndexError):
+                return False
+            return int(last_modified) <= int(since)
+        return False
+    
+    CONDITIONAL_HEADERS = ('ETag', 'Last-Modified', 'Cache-Control', 'Vary', 'Expires', 'X-Cache')
+    
+    def conditional(self, request_headers, response):
+        """Turn a 200 response into a bodiless 304 when the client copy is current"""
+        status, headers, body = response
+        if status != 200 or not request_headers:
+            return response
+        last_modified = headers.get('Last-Modified')
+        if last_modified is not None:
+            from email.utils import parsedate_to_datetime
+            try:
+                last_modified = parsedate_to_datetime(last_modified).timestamp()
+            except (TypeError, ValueError, IndexError):
+                last_modified = None
+        if not self.not_modified(request_headers, headers.get('ETag'), last_modified):
+            return response
+        # A 304 carries the validators the 200 would have had for this encoding
+        if self.compressible(status, headers, body):
+            headers = self.representation(headers, self.negotiate_encoding(request_headers))
+        kept = {key: value for key, value in headers.items() if key in self.CONDITIONAL_HEADERS}
+        return 304, kept, b''
+    
+    def invalidate(self, path=None):
+        """Drop cached responses for a path or route pattern (all if omitted)"""
+        return self.cache.invalidate(path)
+    
+    def ابطل_الذاكرة(self, path=None):
+        return self.invalidate(path)
+    
+    def cache_stats(self):
+        return self.cache.stats()
+    
+    def احصاءات_الذاكرة(self):
+        return self.cache_stats()
+    
+    def build_response(self, result, interpreter=None):
+        def page_function(value):
+            # A Nawa function returned by a handler is a page function to stream
+            if interpreter is not None and isinstance(value, FunctionDefNode):
+                return NawaFunction(interpreter, value)
+            return value
+        
+        status = 200
+        if isinstance(result, dict):
+            headers = dict(result.get('headers') or {})
+            if result.get('type') == 'redirect':
+                status = 302
+                headers.setdefault('Location', result.get('url', '/'))
+            status = result.get('status', status)
+            content = page_function(result.get('content', ''))
+            if 'stream' in result:
+                content = StreamBody(page_function(result['stream']), events=result.get('type') == 'events')
+            # Handler-supplied validators skip hashing the body
+            if result.get('etag') is not None:
+                headers['ETag'] = '"' + str(result['etag']).strip('"') + '"'
+            if result.get('last_modified') is not None:
+                # An unparseable time only loses the validator, not the response
+                try:
+                    headers['Last-Modified'] = self.http_date(self.to_timestamp(result['last_modified']))
+                except (TypeError, ValueError, OverflowError, OSError):
+                    print(f"[Nawa Web] قيمة اخر_تعديل غير صالحة: {result['last_modified']!r}", file=sys.stderr)
+            if 'Content-Type' not in headers:
+                if result.get('type') == 'json':
+                    headers['Content-Type'] = 'application/json; charset=utf-8'
+                else:
+                    headers['Content-Type'] = 'text/html; charset=utf-8'
+        else:
+            content = page_function(result)
+            headers = {'Content-Type': 'text/html; charset=utf-8'}
+        
+        if content is None:
+            content = ''
+        if isinstance(content, StreamBody):
+            return status, headers, content
+        if callable(content) or hasattr(content, '__next__') or hasattr(content, 'read'):
+            return status, headers, StreamBody(content)
+        body = content if isinstance(content, bytes) else str(content).encode('utf-8')
+        return status, headers, body
+    
+    def stats(self):
+        stats = self.pool.stats() if self.pool else {'workers': 0}
+        if self.limiter is not None:
+            stats['rate_limit'] = self.limiter.stats()
+        if self.access_log is not None:
+            stats['access_log'] = self.access_log.stats()
+        return stats
+    
+    def احصاءات(self):
+        return self.stats()
+    
+    def make_handler(self):
+        from http.server import BaseHTTPRequestHandler
         
         server = self
         class Handler(BaseHTTPRequestHandler):
             def do_GET(self):
-                path = self.path.split('?')[0]
-                
-                if path in server.routes:
-                    result = server.routes[path]()
-                    if isinstance(result, dict):
-                        content = result['content']
-                        headers = result.get('headers', {})
-                    else:
-                        content = str(result)
-                        headers = {'Content-Type': 'text/html; charset=utf-8'}
-                    
-                    self.send_response(200)
-                    for key, value in headers.items():
-                        self.send_header(key, value)
-                    self.end_headers()
-                    self.wfile.write(content.encode('utf-8'))
-                else:
-                    self.send_response(404)
-                    self.end_headers()
-                    self.wfile.write(b'404 - Page Not Found')
+                self.respond(*server.dispatch('GET', self.path, None, self.headers, self.client_address[0]))
+            
+            def do_HEAD(self):
+                self.respond(*server.dispatch('GET', self.path, None, self.headers, self.client_address[0]),
+                             include_body=False)
             
             def do_POST(self):
                 content_length = int(self.headers.get('Content-Length', 0))
-                body = self.rfile.read(content_length).decode('utf-8')
-                
-                path = self.path.split('?')[0]
-                if path in server.routes:
-                    result = server.routes[path](body)
-                    if isinstance(result, dict):
-                        content = result['content']
-                        headers = result.get('headers', {})
+                if content_length > server.max_body_size:
+                    # The body is left unread, so the connection cannot be reused
+                    self.respond(413, {'Content-Type': 'text/plain; charset=utf-8',
+                                       'Connection': 'close'}, b'413 - Payload Too Large')
+                    return
+                # Rejected requests cost no upload: limits come before the body
+                client = self.client_address[0]
+                admission = server.admit(self.command, self.path, client)
+                if admission[0] is not None:
+                    status, headers, body = server.dispatch(self.command, self.path, None, self.headers,
+                                                            client, admission)
+                    self.respond(status, dict(headers, Connection='close'), body)
+                    return
+                try:
+                    body = server.read_body(self.rfile, content_length)
+                except BaseException:
+                    server.release(admission)
+                    raise
+                self.respond(*server.dispatch(self.command, self.path, body, self.headers, client, admission))
+            
+            do_PUT = do_PATCH = do_DELETE = do_POST
+            
+            def parse_request(self):
+                self.started = time.perf_counter()
+                return super().parse_request()
+            
+            def respond(self, status, headers, body, include_body=True):
+                if isinstance(body, StreamBody):
+                    return self.respond_stream(status, headers, body, include_body)
+                self.send_response(status)
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                if status in (204, 304):
+                    self.end_headers()
+                    self.log_access(status, 0)
+                    return
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                if include_body:
+                    if isinstance(body, FileBody):
+                        self.wfile.flush()
+                        body.send_to(self.connection)
                     else:
-                        content = str(result)
-                        headers = {'Content-Type': 'text/html; charset=utf-8'}
-                    
-                    self.send_response(200)
+                        self.wfile.write(body)
+                self.log_access(status, len(body) if include_body else 0)
+            
+            def log_access(self, status, size):
+                server.log_request(self.command, self.path, status, size, self.started,
+                                   self.client_address[0])
+            
+            def respond_stream(self, status, headers, body, include_body):
+                # Chunked framing needs an HTTP/1.1 status line; HTTP/1.0
+                # clients get the raw bytes delimited by closing the connection
+                chunked = self.request_version == 'HTTP/1.1'
+                if chunked:
+                    self.protocol_version = 'HTTP/1.1'
+                sent = 0
+                try:
+                    self.send_response(status)
                     for key, value in headers.items():
                         self.send_header(key, value)
+                    if chunked:
+                        self.send_header('Transfer-Encoding', 'chunked')
+                    self.send_header('Connection', 'close')
                     self.end_headers()
-                    self.wfile.write(content.encode('utf-8'))
-                else:
-                    self.send_response(404)
-                    self.end_headers()
+                    if include_body:
+                        for chunk in body:
+                            self.wfile.write(b'%x\r\n%s\r\n' % (len(chunk), chunk) if chunked else chunk)
+                            sent += len(chunk)
+                        if chunked:
+                            self.wfile.write(b'0\r\n\r\n')
+                except ConnectionError:
+                    pass
+                except Exception as e:
+                    # Headers are already sent: end the response without the final chunk
+                    print(f"[Nawa Web] خطأ في البث {self.path}: {e}")
+                finally:
+                    body.close()
+                    self.log_access(status, sent)
+            
+            def log_request(self, code='-', size='-'):
+                # Requests are recorded by log_access once the response is sent
+                pass
             
             def log_message(self, format, *args):
-                print(f"[Nawa Web] {args[0]}")
+                print(f"[Nawa Web] {format % args}")
+        return Handler
+    
+    def make_httpd(self, handler):
+        from http.server import HTTPServer
         
-        httpd = HTTPServer(('localhost', self.port), Handler)
-        print(f"🌐 خادم نواة يعمل على http://localhost:{self.port}")
-        print("اضغط Ctrl+C للإيقاف")
+        server = self
+        if self.workers:
+            pool = self.pool = WorkerPool(self.workers, self.queue_size)
+            class NawaHTTPServer(HTTPServer):
+                request_queue_size = 128
+                
+                def process_request(self, request, client_address):
+                    if not pool.submit(self.process_request_worker, request, client_address):
+                        try:
+                            request.sendall(server.SERVICE_UNAVAILABLE)
+                        except OSError:
+                            pass
+                        self.shutdown_request(request)
+                
+                def process_request_worker(self, request, client_address):
+                    try:
+                        self.finish_request(request, client_address)
+                    except Exception:
+                        self.handle_error(request, client_address)
+                    finally:
+                        self.shutdown_request(request)
+        else:
+            NawaHTTPServer = HTTPServer
+        
+        if self.listen_socket is None:
+            return NawaHTTPServer((self.host, self.port), handler)
+        
+        # Pre-fork worker: serve on the socket prepared by the supervisor
+        httpd = NawaHTTPServer(self.listen_socket.getsockname()[:2], handler, bind_and_activate=False)
+        httpd.socket.close()
+        httpd.socket = self.listen_socket
+        return httpd
+    
+    def serve(self, processes=0):
+        if processes and processes > 1:
+            return PreforkSupervisor(self, processes).run()
+        # The script's top level has run: routes and functions are all defined
+        HotReloader.start_all()
+        
+        if self.engine == 'asyncio':
+            self.runner = AsyncHTTPEngine(self)
+            try:
+                return self.runner.serve()
+            finally:
+                if self.access_log is not None:
+                    self.access_log.close()
+        
+        httpd = self.runner = self.make_httpd(self.make_handler())
+        if self.banner:
+            print(f"🌐 خادم نواة يعمل على http://{self.host}:{self.port}")
+            if self.workers:
+                print(f"👷 العمال: {self.workers} | حد الطابور: {self.queue_size}")
+            print("اضغط Ctrl+C للإيقاف")
         try:
             httpd.serve_forever()
         except KeyboardInterrupt:
             print("\nإيقاف خادم نواة...")
-            httpd.shutdown()
+        finally:
+            httpd.server_close()
+            if self.pool:
+                self.pool.shutdown()
+                self.pool = None
+            if self.access_log is not None:
+                self.access_log.close()
+    
+    def stop(self):
+        """Ask a running server to stop after the requests it is handling"""
+        runner = self.runner
+        if runner is None:
+            return
+        if isinstance(runner, AsyncHTTPEngine):
+            runner.stop()
+        else:
+            threading.Thread(target=runner.shutdown, daemon=True).start()
+    
+    def شغل(self, عمليات=0):
+        self.serve(processes=عمليات)
+    
+    def اوقف(self):
+        self.stop()
+
+class AsyncHTTPEngine:
+    """⚡ محرك asyncio - asyncio HTTP/1.1 Engine
+
+    Serves a WebServer with `asyncio.start_server`. Connections are kept
+    alive between requests and pipelined requests are answered in order,
+    so idle clients cost a coroutine rather than a thread. Route handlers
+    run unchanged on a thread pool, off the event loop.
+    """
+    
+    MAX_HEADER_BYTES = 64 * 1024
+    KEEPALIVE_TIMEOUT = 15
+    METHODS = ('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE')
+    
+    def __init__(self, server):
+        self.server = server
+        self.executor = None
+        self.loop = None
+        self.stopped = None
+        self.in_flight = 0
+        self.limit = server.workers + server.queue_size if server.workers else 0
+    
+    def serve(self):
+        import asyncio
+        if self.server.banner:
+            print(f"🌐 خادم نواة (asyncio) يعمل على http://{self.server.host}:{self.server.port}")
+            print("اضغط Ctrl+C للإيقاف")
+        try:
+            asyncio.run(self.main())
+        except KeyboardInterrupt:
+            print("\nإيقاف خادم نواة...")
+    
+    async def main(self):
+        import asyncio
+        from concurrent.futures import ThreadPoolExecutor
+        
+        self.loop = asyncio.get_running_loop()
+        self.stopped = asyncio.Event()
+        self.executor = ThreadPoolExecutor(max_workers=self.server.workers or None,
+                                           thread_name_prefix='nawa-async')
+        try:
+            if self.server.listen_socket is not None:
+                listener = await asyncio.start_server(self.handle_connection, sock=self.server.listen_socket,
+                                                      limit=self.MAX_HEADER_BYTES)
+            else:
+                listener = await asyncio.start_server(self.handle_connection, self.server.host,
+                                                      self.server.port, limit=self.MAX_HEADER_BYTES,
+                                                      backlog=1024)
+            async with listener:
+                await self.stopped.wait()
+        finally:
+            self.executor.shutdown(wait=True)
+    
+    def stop(self):
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.stopped.set)
+    
+    @staticmethod
+    def parse_head(head):
+        """Parse a request head into (method, target, version, headers) or None"""
+        lines = head.decode('latin-1').split('\r\n')
+        parts = lines[0].split()
+        if len(parts) != 3 or not parts[2].startswith('HTTP/'):
+            return None
+        headers = {}
+        for line in lines[1:]:
+            if not line:
+                continue
+            name, sep, value = line.partition(':')
+            if not sep:
+                return None
+            headers[name.strip().lower()] = value.strip()
+        return parts[0], parts[1], parts[2], headers
+    
+    @staticmethod
+    def serialize(status, headers, body, keep_alive, include_body=True):
+        from http import HTTPStatus
+        try:
+            reason = HTTPStatus(status).phrase
+        except ValueError:
+            reason = ''
+        lines = [f"HTTP/1.1 {status} {reason}"]
+        for key, value in headers.items():
+            lines.append(f"{key}: {value}")
+        if status in (204, 304):
+            body = b''
+        elif isinstance(body, StreamBody):
+            lines.append('Transfer-Encoding: chunked')
+        else:
+            lines.append(f"Content-Length: {len(body)}")
+        lines.append('Connection: keep-alive' if keep_alive else 'Connection: close')
+        head = ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+        return head + body if include_body else head
+    
+    @staticmethod
+    async def send_file(loop, writer, body):
+        with open(body.path, 'rb') as f:
+            try:
+                await loop.sendfile(writer.transport, f, body.offset, body.length)
+            except NotImplementedError:
+                for chunk in body.chunks():
+                    writer.write(chunk)
+                    await writer.drain()
+    
+    async def send_stream(self, loop, writer, body):
+        # Each chunk is produced on the pool (it may run Nawa code or query
+        # a database); drain() holds the producer back to the client's pace.
+        # Returns the bytes sent, or None if the stream failed midway.
+        chunks = iter(body)
+        sent = 0
+        try:
+            while True:
+                try:
+                    chunk = await loop.run_in_executor(self.executor, next, chunks, None)
+                except Exception as e:
+                    # Headers are already sent: drop the connection without the final chunk
+                    print(f"[Nawa Web] خطأ في البث: {e}")
+                    return None
+                if chunk is None:
+                    break
+                if chunk:
+                    writer.write(b'%x\r\n%s\r\n' % (len(chunk), chunk))
+                    sent += len(chunk)
+                    await writer.drain()
+            writer.write(b'0\r\n\r\n')
+            await writer.drain()
+            return sent
+        finally:
+            body.close()
+    
+    async def read_body(self, reader, headers):
+        """Body as bytes, or a temporary file past the server's spool size"""
+        import asyncio
+        import tempfile
+        server = self.server
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            spool = tempfile.SpooledTemporaryFile(server.spool_size)
+            while True:
+                size_line = await reader.readuntil(b'\r\n')
+                size = int(size_line.split(b';')[0].strip(), 16)
+                if size == 0:
+                    # Skip trailers up to the blank line
+                    while await reader.readuntil(b'\r\n') != b'\r\n':
+                        pass
+                    spool.seek(0)
+                    return spool
+                if spool.tell() + size > server.max_body_size:
+                    spool.close()
+                    raise PayloadTooLarge()
+                spool.write(await reader.readexactly(size))
+                await reader.readexactly(2)
+        length = int(headers.get('content-length') or 0)
+        if length > server.max_body_size:
+            raise PayloadTooLarge()
+        if length <= server.spool_size:
+            return await reader.readexactly(length) if length else b''
+        spool = tempfile.SpooledTemporaryFile(server.spool_size)
+        remaining = length
+        while remaining > 0:
+            chunk = await reader.read(min(Request.READ_SIZE, remaining))
+            if not chunk:
+                spool.close()
+                raise asyncio.IncompleteReadError(b'', remaining)
+            spool.write(chunk)
+            remaining -= len(chunk)
+        spool.seek(0)
+        return spool
+    
+    async def handle_connection(self, reader, writer):
+        import asyncio
+        loop = asyncio.get_running_loop()
+        peer = writer.get_extra_info('peername')
+        client = peer[0] if peer else ''
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), self.KEEPALIVE_TIMEOUT)
+                except asyncio.LimitOverrunError:
+                    writer.write(self.serialize(431, {}, b'', False))
+                    break
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                    break
+                
+                request = self.parse_head(head)
+                if request is None:
+                    writer.write(self.serialize(400, {}, b'400 - Bad Request', False))
+                    break
+                method, target, version, headers = request
+                connection = headers.get('connection', '').lower()
+                if version == 'HTTP/1.1':
+                    keep_alive = connection != 'close'
+                else:
+                    keep_alive = connection == 'keep-alive'
+                
+                # Limits are applied before the body is read, so a rejected
+                # client costs no upload; its unread body ends the connection
+                started = time.perf_counter()
+                admission = None
+                if method in self.METHODS and (headers.get('content-length', '0') != '0'
+                                               or 'transfer-encoding' in headers):
+                    admission = self.server.admit(method, target, client)
+                    if admission[0] is not None:
+                        status, out_headers, out_body = self.server.dispatch(method, target, None, headers,
+                                                                             client, admission)
+                        writer.write(self.serialize(status, out_headers, out_body, False))
+                        await writer.drain()
+                        self.server.log_request(method, target, status, len(out_body), started, client)
+                        break
+                
+                try:
+                    body = await self.read_body(reader, headers)
+                except PayloadTooLarge:
+                    self.server.release(admission)
+                    writer.write(self.serialize(413, {'Content-Type': 'text/plain; charset=utf-8'},
+                                                b'413 - Payload Too Large', False))
+                    break
+                except (ValueError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+                    self.server.release(admission)
+                    writer.write(self.serialize(400, {}, b'400 - Bad Request', False))
+                    break
+                except BaseException:
+                    self.server.release(admission)
+                    raise
+                
+                if method not in self.METHODS:
+                    status, out_headers, out_body = 501, {}, b'501 - Not Implemented'
+                elif self.limit and self.in_flight >= self.limit:
+                    self.server.release(admission)
+                    status, out_headers, out_body = 503, {'Retry-After': '1'}, b'503 - Service Unavailable'
+                else:
+                    self.in_flight += 1
+                    try:
+                        status, out_headers, out_body = await loop.run_in_executor(
+                            self.executor, self.server.dispatch,
+                            'GET' if method == 'HEAD' else method, target, body, headers, client, admission)
+                    finally:
+                        self.in_flight -= 1
+                
+                sent = 0 if method == 'HEAD' or status in (204, 304) else None
+                if isinstance(out_body, FileBody):
+                    writer.write(self.serialize(status, out_headers, out_body, keep_alive,
+                                                include_body=False))
+                    await writer.drain()
+                    if method != 'HEAD' and out_body.length:
+                        await self.send_file(loop, writer, out_body)
+                elif isinstance(out_body, StreamBody):
+                    try:
+                        writer.write(self.serialize(status, out_headers, out_body, keep_alive,
+                                                    include_body=False))
+                        await writer.drain()
+                        if method != 'HEAD':
+                            sent = await self.send_stream(loop, writer, out_body)
+                    finally:
+                        out_body.close()
+                    if sent is None:
+                        break
+                else:
+                    writer.write(self.serialize(status, out_headers, out_body, keep_alive,
+                                                include_body=method != 'HEAD'))
+                    await writer.drain()
+                self.server.log_request(method, target, status, len(out_body) if sent is None else sent,
+                                        started, client)
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+class PreforkSupervisor:
+    """🧬 مشرف العمليات - Pre-fork Supervisor
+
+    Forks N worker processes after the script has registered its routes.
+    Each worker runs its own copy of the interpreter and accepts on its own
+    SO_REUSEPORT socket, so the kernel spreads connections across them
+    (falling back to one inherited listening socket where SO_REUSEPORT is
+    unavailable). Crashed workers are restarted; SIGTERM/SIGINT stop all
+    workers gracefully.
+
+    A worker that dies within STARTUP_WINDOW seconds of starting is
+    restarted after a delay that doubles each time (up to MAX_BACKOFF);
+    after MAX_FAILURES such deaths in a row the supervisor stops the other
+    workers and exits with status 1.
+
+    Databases opened by the script before serving are reopened in each
+    worker (Database.after_fork), since an SQLite connection must not be
+    used across fork().
+    """
+    
+    RESTART_BACKOFF = 1.0
+    MAX_BACKOFF = 30.0
+    STARTUP_WINDOW = 5.0
+    MAX_FAILURES = 5
+    SHUTDOWN_TIMEOUT = 10
+    
+    def __init__(self, server, processes):
+        self.server = server
+        self.processes = processes
+        self.children = {}
+        self.stopping = False
+        self.failed = False
+        self.failures = {}  # slot -> workers in a row that died at startup
+        self.restarts = {}  # slot -> monotonic time to respawn it
+        self.shared_socket = None
+        self.reuse_port = hasattr(socket, 'SO_REUSEPORT')
+    
+    def make_socket(self, reuse_port):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if reuse_port:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        sock.bind((self.server.host, self.server.port))
+        sock.listen(1024)
+        return sock
+    
+    def spawn(self, slot):
+        pid = os.fork()
+        if pid:
+            self.children[pid] = (slot, time.monotonic())
+            return
+        
+        # Worker process: never return into the rest of the Nawa script
+        code = 0
+        try:
+            for db in list(Database.instances):
+                db.after_fork()
+            signal.signal(signal.SIGTERM, lambda *_: self.server.stop())
+            signal.signal(signal.SIGINT, lambda *_: self.server.stop())
+            self.server.listen_socket = self.shared_socket or self.make_socket(True)
+            self.server.banner = False
+            self.server.serve()
+        except BaseException as e:
+            print(f"[Nawa Prefork] العامل {os.getpid()} توقف: {e}")
+            code = 1
+        finally:
+            sys.stdout.flush()
+            os._exit(code)
+    
+    def handle_signal(self, signum, frame):
+        if self.stopping:
+            return
+        self.stopping = True
+        print("\nإيقاف عمليات نواة...")
+        self.stop_workers()
+    
+    def stop_workers(self):
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        signal.signal(signal.SIGALRM, self.handle_timeout)
+        signal.alarm(self.SHUTDOWN_TIMEOUT)
+    
+    def handle_timeout(self, signum, frame):
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+    
+    def exited(self, pid, status):
+        slot, started = self.children.pop(pid, (None, 0))
+        if slot is None or self.stopping:
+            return
+        if time.monotonic() - started >= self.STARTUP_WINDOW:
+            self.failures[slot] = 0
+            delay = 0
+        else:
+            # Back off while the worker keeps dying right after start
+            self.failures[slot] = failures = self.failures.get(slot, 0) + 1
+            if failures >= self.MAX_FAILURES:
+                print(f"[Nawa Prefork] العامل توقف {failures} مرات متتالية عند البدء، إيقاف الخادم")
+                self.failed = self.stopping = True
+                self.stop_workers()
+                return
+            delay = min(self.RESTART_BACKOFF * 2 ** (failures - 1), self.MAX_BACKOFF)
+        print(f"[Nawa Prefork] العامل {pid} انتهى (الحالة {status})، إعادة التشغيل"
+              f"{f' بعد {delay:g} ثانية' if delay else ''}...")
+        self.restarts[slot] = time.monotonic() + delay
+    
+    def run(self):
+        if not hasattr(os, 'fork'):
+            print("⚠️ تعدد العمليات غير مدعوم على هذا النظام، سيعمل الخادم بعملية واحدة")
+            return self.server.serve()
+        
+        if not self.reuse_port:
+            self.shared_socket = self.make_socket(False)
+        
+        signal.signal(signal.SIGTERM, self.handle_signal)
+        signal.signal(signal.SIGINT, self.handle_signal)
+        
+        for slot in range(self.processes):
+            self.spawn(slot)
+        print(f"🌐 خادم نواة يعمل على http://{self.server.host}:{self.server.port}")
+        print(f"🧬 العمليات: {self.processes} | المحرك: {self.server.engine}"
+              f"{' | SO_REUSEPORT' if self.reuse_port else ''}")
+        print("اضغط Ctrl+C للإيقاف")
+        
+        while self.children or self.restarts:
+            if self.stopping:
+                self.restarts.clear()
+            now = time.monotonic()
+            for slot, due in list(self.restarts.items()):
+                if due <= now:
+                    del self.restarts[slot]
+                    self.spawn(slot)
+            # While a restart is pending, poll so exits are still seen as they happen
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG) if self.restarts else os.wait()
+            except ChildProcessError:
+                pid = 0
+                if not self.restarts:
+                    break
+            if pid:
+                self.exited(pid, status)
+            else:
+                time.sleep(0.1)
+        
+        signal.alarm(0)
+        if self.shared_socket is not None:
+            self.shared_socket.close()
+        if self.failed:
+            sys.exit(1)
+
+class ConnectionPool:
+    """🏊 مجمع الاتصالات - SQLite Reader Pool
+
+    Read-only connections to one database file. A thread is handed back
+    the connection it used last when that one is idle, so in steady state
+    every thread reads through its own connection and warm page cache. At
+    most `max_size` connections exist (a thread already holding one may
+    open an overflow connection rather than wait on itself); others wait.
+    Connections idle longer than HEALTH_INTERVAL are checked with
+    `SELECT 1` and replaced if broken.
+
+    A connection whose QueryRows is garbage collected without close() is
+    handed back through abandon(); the finalizer that calls it cannot
+    take the pool's lock, so acquire() reclaims such connections, and
+    waiting threads wake every RECLAIM_INTERVAL to look for them.
+    """
+    
+    HEALTH_INTERVAL = 30.0
+    WAIT_TIMEOUT = 30.0
+    RECLAIM_INTERVAL = 0.5
+    
+    def __init__(self, path, max_size=8, warm=2, pragmas=(), cached_statements=128):
+        self.path = path
+        self.max_size = max_size
+        self.cached_statements = cached_statements
+        self.pragmas = list(pragmas)
+        self.idle = []  # (connection, last used, thread id), most recent last
+        self.condition = threading.Condition()
+        self.holders = {}  # thread id -> connections it has checked out
+        self.abandoned = deque()  # (connection, thread id) of rows dropped unclosed
+        self.size = 0
+        self.in_use = 0
+        self.created = 0
+        self.replaced = 0
+        self.waits = 0
+        self.checkouts = 0
+        self.closed = False
+        for _ in range(min(warm, max_size)):
+            self.idle.append((self.open(), time.monotonic(), None))
+            self.size += 1
+    
+    def open(self):
+        from urllib.parse import quote
+        conn = sqlite3.connect(f"file:{quote(os.path.abspath(self.path))}?mode=ro", uri=True,
+                               check_same_thread=False, cached_statements=self.cached_statements)
+        for pragma in self.pragmas:
+            conn.execute(pragma)
+        self.created += 1
+        return conn
+    
+    def configure(self, pragmas):
+        """Apply per-connection pragmas to idle connections and every new one"""
+        with self.condition:
+            self.pragmas = list(pragmas)
+            for conn, _, _ in self.idle:
+                for pragma in self.pragmas:
+                    conn.execute(pragma)
+    
+    def check(self, conn):
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return conn
+        except sqlite3.Error:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+            self.replaced += 1
+            return self.open()
+    
+    def acquire(self):
+        me = threading.get_ident()
+        deadline = None
+        with self.condition:
+            while True:
+                self.reclaim()
+                nested = self.holders.get(me, 0) > 0
+                if self.idle:
+                    index = len(self.idle) - 1
+                    for i in range(index, -1, -1):
+                        if self.idle[i][2] == me:
+                            index = i
+                            break
+                    conn, last_used, _ = self.idle.pop(index)
+                    break
+                if self.size < self.max_size or nested:
+                    conn = last_used = None
+                    self.size += 1
+                    break
+                if deadline is None:
+                    self.waits += 1
+                    deadline = time.monotonic() + self.WAIT_TIMEOUT
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise sqlite3.OperationalError("انتهت مهلة انتظار اتصال من المجمع")
+                self.condition.wait(min(remaining, self.RECLAIM_INTERVAL))
+            self.in_use += 1
+            self.checkouts += 1
+            self.holders[me] = self.holders.get(me, 0) + 1
+        try:
+            if conn is None:
+                conn = self.open()
+            elif time.monotonic() - last_used > self.HEALTH_INTERVAL:
+                conn = self.check(conn)
+        except BaseException:
+            with self.condition:
+                self.size -= 1
+                self.in_use -= 1
+                self.forget(me)
+                self.condition.notify()
+            raise
+        return conn
+    
+    def release(self, conn, owner=None):
+        """Return `conn`, checked out by thread `owner` (the calling thread by default)"""
+        with self.condition:
+            self.put_back(conn, owner or threading.get_ident())
+            self.condition.notify()
+    
+    def abandon(self, conn, owner):
+        """Queue a connection for the pool to take back; safe to call from a GC finalizer"""
+        self.abandoned.append((conn, owner))
+    
+    def reclaim(self):
+        while self.abandoned:
+            self.put_back(*self.abandoned.popleft())
+    
+    def forget(self, owner):
+        count = self.holders.get(owner, 0) - 1
+        if count > 0:
+            self.holders[owner] = count
+        else:
+            self.holders.pop(owner, None)
+    
+    def put_back(self, conn, owner):
+        self.forget(owner)
+        self.in_use -= 1
+        if self.closed or self.size > self.max_size:
+            self.size -= 1
+            conn.close()
+        else:
+            self.idle.append((conn, time.monotonic(), owner))
+    
+    def stats(self):
+        return {
+            'max_size': self.max_size,
+            'size': self.size,
+            'idle': len(self.idle),
+            'in_use': self.in_use,
+            'created': self.created,
+            'replaced': self.replaced,
+            'waits': self.waits,
+            'checkouts': self.checkouts,
+        }
+    
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.reclaim()
+            for conn, _, _ in self.idle:
+                conn.close()
+            self.size -= len(self.idle)
+            self.idle = []
 
 class Database:
-    """💾 قاعدة بيانات SQLite - SQLite Database"""
+    """💾 قاعدة بيانات SQLite - SQLite Database
+
+    Every write commits on its own by default. Inside begin()/commit() (or
+    a transaction() block) writes share one transaction; with
+    autocommit(every=N, interval_ms=T) they are committed in batches of N
+    statements or after T milliseconds, whichever comes first.
+
+    Writes go through one writer connection under a lock. The journal mode
+    is left as SQLite's default (a rollback journal); WAL is opt-in through
+    a profile, and persists in the file once set. In WAL mode reads use a
+    pool of read-only connections, so server threads read in parallel
+    without holding up the writer's commits. The thread inside a
+    transaction, and any thread while batched writes are uncommitted,
+    reads through the writer so it sees them.
+
+    A performance profile (PROFILES) sets the journal, sync and cache
+    pragmas together: 'safe' syncs every commit, 'balanced' trades the
+    last commits before a power loss for speed, 'bulk' is for loading
+    data that can be rebuilt. All three switch the file to WAL.
+
+    Every connection keeps `statement_cache` compiled statements, keyed by
+    SQL text; stats()['statements'] counts how often statements repeat
+    recent SQL text (StatementCache). prepare() returns a Statement bound
+    to one SQL text.
+
+    cache_results() turns on a QueryCache of read results; every write
+    made through this Database drops the entries of the tables it touches.
+
+    Every statement is timed into a QueryLog; those slower than
+    `slow_ms` are kept in memory with their query plan (report()), and
+    appended to `slow_path` when one is given, e.g. <name>.slow.jsonl for
+    `nawa --db-report`. advise() turns repeated slow full-scan
+    SELECTs into index suggestions (IndexAdvisor).
+    """
+    
+    READ_STATEMENTS = ('SELECT', 'EXPLAIN', 'VALUES')
+    
+    # journal_mode and synchronous apply to the writer; the rest to every connection
+    PROFILES = {
+        'safe': {'journal_mode': 'WAL', 'synchronous': 'FULL', 'cache_size': -2000,
+                 'mmap_size': 0, 'temp_store': 'DEFAULT', 'busy_timeout': 5000},
+        'balanced': {'journal_mode': 'WAL', 'synchronous': 'NORMAL', 'cache_size': -64000,
+                     'mmap_size': 256 * 1024 * 1024, 'temp_store': 'MEMORY', 'busy_timeout': 5000},
+        'bulk': {'journal_mode': 'WAL', 'synchronous': 'OFF', 'cache_size': -256000,
+                 'mmap_size': 1024 * 1024 * 1024, 'temp_store': 'MEMORY', 'busy_timeout': 30000},
+    }
+    PROFILE_NAMES = {'آمن': 'safe', 'متوازن': 'balanced', 'تحميل': 'bulk'}
+    WRITER_PRAGMAS = ('journal_mode', 'synchronous')
+    
+    # Open databases, so prefork workers can reopen them (after_fork)
+    instances = weakref.WeakSet()
+    # Connections inherited across fork(); kept referenced so they are never closed
+    forked = []
     
-    def __init__(self, name='nawa.db'):
+    def __init__(self, name='nawa.db', batch=0, interval_ms=0, pool_size=8, warm=2, profile=None,
+                 statement_cache=256, slow_ms=100, slow_path=None):
         self.name = name
-        self.conn = sqlite3.connect(name, check_same_thread=False)
+        self.cached_statements = statement_cache
+        self.conn = sqlite3.connect(name, check_same_thread=False, cached_statements=statement_cache)
+        self.statements = StatementCache(statement_cache)
+        self.cursor = self.conn.cursor()
+        self.lock = threading.RLock()
+        self.depth = 0
+        self.owner = None
+        self.pending = 0
+        self.timer = None
+        self.profile = None
+        self.results = None
+        self.autocommit(batch, interval_ms)
+        self.in_memory = name in (':memory:', '') or 'mode=memory' in name
+        self.queries = QueryLog(slow_ms, slow_path)
+        self.pool = None
+        self.pool_options = (pool_size, warm, statement_cache) if pool_size and not self.in_memory else None
+        if profile:
+            self.use_profile(profile)
+        else:
+            self.open_pool()
+        Database.instances.add(self)
+    
+    def after_fork(self):
+        """Open fresh connections in a forked worker process.
+
+        The parent's connections are dropped without closing them: closing
+        could checkpoint or unlock the file the parent is still using. An
+        in-memory database is private to the process and is kept as is.
+        """
+        if self.in_memory:
+            return
+        Database.forked.append((self.conn, self.pool))
+        self.lock = threading.RLock()
+        self.depth = 0
+        self.owner = None
+        self.pending = 0
+        self.timer = None
+        self.conn = sqlite3.connect(self.name, check_same_thread=False,
+                                    cached_statements=self.cached_statements)
         self.cursor = self.conn.cursor()
+        self.pool = None
+        if self.profile:
+            self.use_profile(self.profile)
+        else:
+            self.open_pool()
+    
+    def open_pool(self):
+        """Start the reader pool once the file is in WAL mode (a no-op otherwise)"""
+        if self.pool is not None or self.pool_options is None:
+            return
+        # Only under WAL do readers never block the writer's commits (nor it them)
+        with self.lock:
+            mode = self.conn.execute("PRAGMA journal_mode").fetchone()[0]
+        if mode.lower() == 'wal':
+            size, warm, statement_cache = self.pool_options
+            self.pool = ConnectionPool(self.name, size, warm, cached_statements=statement_cache)
+    
+    def use_profile(self, name):
+        """Switch to a performance profile by name (safe, balanced, bulk or آمن, متوازن, تحميل)"""
+        key = self.PROFILE_NAMES.get(name, name)
+        if key not in self.PROFILES:
+            raise ValueError(f"ملف أداء غير معروف: {name} "
+                             f"(المتاح: {', '.join(list(self.PROFILES) + list(self.PROFILE_NAMES))})")
+        settings = self.PROFILES[key]
+        shared = [f"PRAGMA {pragma}={value}" for pragma, value in settings.items()
+                  if pragma not in self.WRITER_PRAGMAS]
+        with self.lock:
+            self.flush()
+            for pragma, value in settings.items():
+                self.conn.execute(f"PRAGMA {pragma}={value}")
+            self.open_pool()
+            if self.pool is not None:
+                self.pool.configure(shared)
+            self.profile = key
+    
+    def ملف_أداء(self, name):
+        self.use_profile(name)
+    
+    def pragmas(self):
+        """Current values of the pragmas a profile sets, read from the writer"""
+        with self.lock:
+            return {pragma: self.conn.execute(f"PRAGMA {pragma}").fetchone()[0]
+                    for pragma in self.PROFILES['safe']}
+    
+    def reader(self):
+        """A pooled reader connection, or None to read through the writer"""
+        if self.pool is None or self.owns_transaction():
+            return None
+        # Batched writes are uncommitted but belong to no one thread
+        if not self.depth and self.conn.in_transaction:
+            return None
+        return self.pool.acquire()
+    
+    def read(self, sql, params=None):
+        conn = self.reader()
+        if conn is None:
+            with self.lock:
+                self.cursor.execute(sql, params or [])
+                return self.cursor.fetchall()
+        try:
+            return conn.execute(sql, params or []).fetchall()
+        finally:
+            self.pool.release(conn)
+    
+    @classmethod
+    def is_read(cls, sql):
+        words = sql.lstrip().split(None, 1)
+        return bool(words) and words[0].upper() in cls.READ_STATEMENTS
+    
+    def stats(self):
+        stats = {'in_transaction': self.conn.in_transaction, 'pending': self.pending,
+                 'profile': self.profile, 'statements': self.statements.stats()}
+        if self.results is not None:
+            stats['results'] = self.results.stats()
+        if self.pool is not None:
+            stats['pool'] = self.pool.stats()
+        return stats
+    
+    def احصاءات(self):
+        return self.stats()
+    
+    def cache_results(self, max_entries=1024, ttl=60):
+        """Cache read results for `ttl` seconds, keyed by SQL and parameters (0 entries: off)"""
+        with self.lock:
+            self.results = QueryCache(max_entries, ttl) if max_entries else None
+            if self.results is not None:
+                self.refresh_schema()
+    
+    def خزن_النتائج(self, حد=1024, مدة=60):
+        self.cache_results(حد, مدة)
+    
+    def refresh_schema(self):
+        """Tell the result cache which names are views and whether triggers exist"""
+        rows = self.conn.execute(
+            "SELECT type, name FROM sqlite_master WHERE type IN ('view', 'trigger')").fetchall()
+        self.results.views = {QueryCache.normalize(name) for kind, name in rows if kind == 'view'}
+        self.results.triggers = any(kind == 'trigger' for kind, _ in rows)
+    
+    def written(self, sql):
+        """Drop cached results a write with `sql` may have changed"""
+        if self.results is None:
+            return
+        self.results.invalidate_for(sql)
+        if QueryCache.DDL.match(sql):
+            self.refresh_schema()
+    
+    def invalidate(self, table=None):
+        """Drop cached results reading `table` (everything if None); returns entries dropped"""
+        if self.results is None:
+            return 0
+        return self.results.invalidate([table] if table else None)
+    
+    def ابطل_النتائج(self, جدول=None):
+        return self.invalidate(جدول)
+    
+    def slow_log(self, threshold_ms=100, path=None):
+        """Record statements slower than `threshold_ms`, and append them to `path` if given"""
+        self.queries.threshold = threshold_ms / 1000 if threshold_ms else None
+        if path:
+            self.queries.log_to(path)
+    
+    def سجل_البطء(self, حد=100, مسار=None):
+        self.slow_log(حد, مسار)
+    
+    def timed(self, sql, params, started):
+        """Account for a statement run on this database (every path ends here)"""
+        self.statements.record(sql)
+        self.queries.record(self, sql, params, time.perf_counter() - started)
+    
+    def explain(self, sql, params=None):
+        """EXPLAIN QUERY PLAN of `sql` as indented lines (empty if it can't be explained)"""
+        if params is None:
+            params = QueryLog.null_params(sql)
+        try:
+            with self.lock:
+                rows = self.conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+        except (sqlite3.Error, ValueError):
+            return []
+        depth = {0: -1}
+        lines = []
+        for node, parent, _, detail in rows:
+            depth[node] = depth.get(parent, -1) + 1
+            lines.append('  ' * depth[node] + detail)
+        return lines
+    
+    def اشرح(self, sql, params=None):
+        return self.explain(sql, params)
+    
+    def report(self, top=20):
+        """Statements by total time, with counts, slowest run and full scans"""
+        return self.queries.summary(top)
+    
+    def تقرير(self, عدد=20):
+        return self.report(عدد)
+    
+    def advise(self, apply=False, min_count=2, statements=None):
+        """Index suggestions for SELECTs slow at least `min_count` times; `apply` creates verified ones"""
+        if statements is None:
+            statements = self.queries.slow_statements(min_count)
+        return IndexAdvisor(self).advise(statements, apply)
+    
+    def اقترح_فهارس(self, طبق=False, تكرار=2):
+        return self.advise(طبق, تكرار)
+    
+    def cached_read(self, sql, params=None):
+        results = self.results
+        key = results.key(sql, params) if results is not None else None
+        if key is None:
+            return self.read(sql, params)
+        rows = results.get(key)
+        if rows is not None:
+            return rows
+        # Rows read while a write is uncommitted may be stale once it commits
+        generation = results.generation
+        fresh = not self.conn.in_transaction
+        rows = self.read(sql, params)
+        if fresh and not self.conn.in_transaction:
+            results.put(key, rows, generation)
+        return rows
+    
+    def autocommit(self, every=0, interval_ms=0):
+        """Commit every `every` writes or `interval_ms` after the first uncommitted one (0, 0: each write)"""
+        with self.lock:
+            self.flush()
+            self.batch = every
+            self.interval = interval_ms / 1000
+    
+    def اضبط_الالتزام(self, كل=0, مهلة=0):
+        self.autocommit(كل, مهلة)
+    
+    def committed(self):
+        """Commit after a write unless a transaction or a batch is still open"""
+        if self.depth or not self.conn.in_transaction:
+            return
+        if not self.batch and not self.interval:
+            self.conn.commit()
+            return
+        self.pending += 1
+        if self.batch and self.pending >= self.batch:
+            self.flush()
+        elif self.interval and self.timer is None:
+            self.timer = threading.Timer(self.interval, self.flush)
+            self.timer.daemon = True
+            self.timer.start()
+    
+    def flush(self):
+        """Commit writes held back by autocommit batching"""
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+            if not self.depth and self.conn.in_transaction:
+                self.conn.commit()
+            self.pending = 0
+    
+    def begin(self):
+        """Start a transaction; nested calls open savepoints.
+
+        The transaction belongs to the calling thread: it holds the writer
+        lock until the matching commit()/rollback(), so other threads'
+        writes wait instead of joining it.
+        """
+        self.lock.acquire()
+        try:
+            if self.depth:
+                self.conn.execute(f"SAVEPOINT nawa_{self.depth}")
+            else:
+                self.flush()
+                self.conn.execute("BEGIN")
+                self.owner = threading.get_ident()
+        except BaseException:
+            self.lock.release()
+            raise
+        self.depth += 1
+    
+    def owns_transaction(self):
+        """True if the calling thread has a transaction open"""
+        return self.depth > 0 and self.owner == threading.get_ident()
+    
+    @classmethod
+    def roll_back_thread(cls):
+        """Roll back every transaction the calling thread left open; returns those databases"""
+        abandoned = [db for db in list(cls.instances) if db.owns_transaction()]
+        for db in abandoned:
+            while db.owns_transaction():
+                db.rollback()
+        return abandoned
+    
+    def commit(self):
+        with self.lock:
+            if not self.owns_transaction():
+                self.flush()
+                return
+            try:
+                if self.depth > 1:
+                    self.conn.execute(f"RELEASE SAVEPOINT nawa_{self.depth - 1}")
+                else:
+                    self.conn.commit()
+            finally:
+                self.depth -= 1
+                if not self.depth:
+                    self.owner = None
+                self.lock.release()
+    
+    def rollback(self):
+        with self.lock:
+            if not self.owns_transaction():
+                self.conn.rollback()
+                self.pending = 0
+                return
+            try:
+                if self.depth > 1:
+                    self.conn.execute(f"ROLLBACK TO SAVEPOINT nawa_{self.depth - 1}")
+                    self.conn.execute(f"RELEASE SAVEPOINT nawa_{self.depth - 1}")
+                else:
+                    self.conn.rollback()
+            finally:
+                self.depth -= 1
+                if not self.depth:
+                    self.owner = None
+                self.lock.release()
+    
+    def transaction(self, func, *args):
+        """Run `func` in a transaction: committed if it returns, rolled back if it fails"""
+        self.begin()
+        try:
+            result = func(*args)
+        except BaseException:
+            self.rollback()
+            raise
+        self.commit()
+        return result
+    
+    def ابدأ_معاملة(self):
+        self.begin()
+    
+    def ثبت(self):
+        self.commit()
+    
+    def تراجع(self):
+        self.rollback()
+    
+    def معاملة(self, func, *args):
+        return self.transaction(func, *args)
     
     def create_table(self, table_name, columns):
         cols = ', '.join([f"{k} {v}" for k, v in columns.items()])
         sql = f"CREATE TABLE IF NOT EXISTS {table_name} ({cols})"
-        self.cursor.execute(sql)
-        self.conn.commit()
+        started = time.perf_counter()
+        with self.lock:
+            self.cursor.execute(sql)
+            self.committed()
+            self.written(sql)
+        self.timed(sql, None, started)
     
     def insert(self, table_name, data):
         columns = ', '.join(data.keys())
         placeholders = ', '.join(['?' for _ in data])
         sql = f"INSERT INTO {table_name} ({columns}) VALUES ({placeholders})"
-        self.cursor.execute(sql, list(data.values()))
-        self.conn.commit()
-        return self.cursor.lastrowid
+        started = time.perf_counter()
+        with self.lock:
+            self.cursor.execute(sql, list(data.values()))
+            self.committed()
+            self.written(sql)
+            rowid = self.cursor.lastrowid
+        self.timed(sql, list(data.values()), started)
+        return rowid
     
     def select(self, table_name, where=None, params=None):
         sql = f"SELECT * FROM {table_name}"
         if where:
             sql += f" WHERE {where}"
-        self.cursor.execute(sql, params or [])
-        rows = self.cursor.fetchall()
-        return [list(row) for row in rows]  # Return as lists for integer indexing
+        started = time.perf_counter()
+        rows = [list(row) for row in self.cached_read(sql, params)]  # Return as lists for integer indexing
+        self.timed(sql, params, started)
+        return rows
     
     def update(self, table_name, data, where, params=None):
         set_clause = ', '.join([f"{k} = ?" for k in data.keys()])
         sql = f"UPDATE {table_name} SET {set_clause} WHERE {where}"
-        self.cursor.execute(sql, list(data.values()) + (params or []))
-        self.conn.commit()
-        return self.cursor.rowcount
+        params = list(data.values()) + (params or [])
+        started = time.perf_counter()
+        with self.lock:
+            self.cursor.execute(sql, params)
+            self.committed()
+            self.written(sql)
+            count = self.cursor.rowcount
+        self.timed(sql, params, started)
+        return count
     
     def delete(self, table_name, where, params=None):
         sql = f"DELETE FROM {table_name} WHERE {where}"
-        self.cursor.execute(sql, params or [])
-        self.conn.commit()
-        return self.cursor.rowcount
+        started = time.perf_counter()
+        with self.lock:
+            self.cursor.execute(sql, params or [])
+            self.committed()
+            self.written(sql)
+            count = self.cursor.rowcount
+        self.timed(sql, params, started)
+        return count
     
     def execute(self, sql, params=None):
-        self.cursor.execute(sql, params or [])
-        self.conn.commit()
-        return [list(row) for row in self.cursor.fetchall()]  # Return as lists
+        return self.execute_as(sql, self.is_read(sql), params)
+    
+    def execute_as(self, sql, is_read, params=None):
+        started = time.perf_counter()
+        if is_read:
+            rows = [list(row) for row in self.cached_read(sql, params)]  # Return as lists
+        else:
+            with self.lock:
+                self.cursor.execute(sql, params or [])
+                self.committed()
+                self.written(sql)
+                rows = [list(row) for row in self.cursor.fetchall()]  # Return as lists
+        self.timed(sql, params, started)
+        return rows
+    
+    def prepare(self, sql):
+        """A reusable Statement for `sql`"""
+        return Statement(self, sql)
+    
+    def جهز(self, sql):
+        return self.prepare(sql)
+    
+    def query(self, sql, params=None, arraysize=1000):
+        """Rows of a query fetched lazily, `arraysize` at a time"""
+        return QueryRows(self, sql, params, arraysize)
+    
+    def استعلم(self, sql, params=None, حجم_الدفعة=1000):
+        return self.query(sql, params, حجم_الدفعة)
+    
+    def execute_many(self, sql, rows):
+        """Run `sql` once per parameter row in a single transaction; returns rows changed.
+
+        `rows` may be a list, any iterator or a Nawa page function; it is
+        consumed as executemany goes, never materialized.
+        """
+        started = time.perf_counter()
+        with self.lock:
+            # A cursor of its own: the rows may come from a page function
+            # that reads this database through the shared cursor meanwhile
+            cursor = self.conn.cursor()
+            self.begin()
+            try:
+                cursor.executemany(sql, iterate(rows))
+                count = cursor.rowcount
+            except BaseException:
+                self.rollback()
+                raise
+            finally:
+                cursor.close()
+            self.commit()
+            self.written(sql)
+        self.timed(sql, QueryLog.MANY, started)
+        return count
+    
+    def insert_many(self, table_name, rows, columns=None):
+        """Insert dicts (columns from the first row's keys) or lists; returns rows inserted"""
+        import itertools
+        rows = iter(iterate(rows))
+        first = next(rows, None)
+        if first is None:
+            return 0
+        rows = itertools.chain([first], rows)
+        if isinstance(first, dict):
+            columns = list(columns or first.keys())
+            rows = ([row.get(column) for column in columns] for row in rows)
+        placeholders = ', '.join('?' * (len(columns) if columns else len(first)))
+        target = f"{table_name} ({', '.join(columns)})" if columns else table_name
+        return self.execute_many(f"INSERT INTO {target} VALUES ({placeholders})", rows)
     
     def run(self, sql, params=None):
         """Alias for execute"""
@@ -582,9 +3402,655 @@ class Database:
         """Alias for execute with Arabic name"""
         return self.execute(sql, params)
     
+    def نفذ_دفعة(self, sql, rows):
+        return self.execute_many(sql, rows)
+    
+    def ادرج_عدة(self, table_name, rows, اعمدة=None):
+        return self.insert_many(table_name, rows, اعمدة)
+    
     def close(self):
+        self.flush()
+        if self.pool is not None:
+            self.pool.close()
         self.conn.close()
 
+class QueryRows:
+    """صفوف استعلام - Lazily fetched query rows
+
+    Iterates its own cursor with fetchmany(arraysize), so memory stays at
+    one batch whatever the size of the result. The cursor is closed at the
+    end of the rows, when a لكل loop breaks out early, or by close(); rows
+    dropped before any of these give their pooled reader back when they
+    are garbage collected.
+    """
+    
+    def __init__(self, db, sql, params=None, arraysize=1000):
+        import contextlib
+        self.db = db
+        self.batch = []
+        self.index = 0
+        self.cursor = None
+        self.finalizer = None
+        if not db.is_read(sql):
+            self.write(sql, params)
+            return
+        # A pooled reader is held until the rows are closed
+        self.conn = db.reader()
+        if self.conn is not None:
+            self.pool = db.pool
+            self.owner = threading.get_ident()
+            self.finalizer = weakref.finalize(self, self.pool.abandon, self.conn, self.owner)
+        self.lock = db.lock if self.conn is None else contextlib.nullcontext()
+        try:
+            with self.lock:
+                self.cursor = (self.conn or db.conn).cursor()
+                self.cursor.arraysize = arraysize
+                self.cursor.execute(sql, params or [])
+        except BaseException:
+            self.close()
+            raise
+        db.statements.record(sql)
+        self.columns = [d[0] for d in self.cursor.description or ()]
+    
+    def write(self, sql, params):
+        """Run a write on the writer like Database.execute; its rows (RETURNING) are read at once"""
+        db = self.db
+        self.conn = None
+        self.lock = db.lock
+        started = time.perf_counter()
+        with db.lock:
+            cursor = db.conn.cursor()
+            try:
+                cursor.execute(sql, params or [])
+                self.columns = [d[0] for d in cursor.description or ()]
+                self.batch = cursor.fetchall()
+            finally:
+                cursor.close()
+            db.committed()
+            db.written(sql)
+        db.timed(sql, params, started)
+        self.cursor = None
+    
+    def __iter__(self):
+        return self
+    
+    def __next__(self):
+        if self.index >= len(self.batch):
+            if self.cursor is None:
+                raise StopIteration
+            with self.lock:
+                self.batch = self.cursor.fetchmany()
+            self.index = 0
+            if not self.batch:
+                self.close()
+                raise StopIteration
+        row = self.batch[self.index]
+        self.index += 1
+        return list(row)
+    
+    def close(self):
+        if self.cursor is not None:
+            self.cursor.close()
+            self.cursor = None
+            self.batch = []
+        if self.finalizer is not None and self.finalizer.detach():
+            self.pool.release(self.conn, self.owner)
+        self.conn = None
+    
+    def اغلق(self):
+        self.close()
+    
+    اعمدة = property(lambda self: self.columns)
+
+class StatementCache:
+    """ذاكرة العبارات - SQL text reuse counters
+
+    Counts how often statements repeat SQL text already run among the last
+    `capacity` distinct statements. Each sqlite3 connection keeps its own
+    cache of compiled statements of that size keyed by the same text, so
+    the reuse rate approximates how often they can hit, but these are not
+    that cache's own counters: with a reader pool each connection's cache
+    sees only part of the traffic.
+    """
+    
+    def __init__(self, capacity=256):
+        self.capacity = capacity
+        self.recent = OrderedDict()  # sql -> None, least recently run first
+        self.lock = threading.Lock()
+        self.reused = 0
+        self.new = 0
+        self.prepared = 0  # executions of prepared statements
+    
+    def record(self, sql):
+        with self.lock:
+            if sql in self.recent:
+                self.recent.move_to_end(sql)
+                self.reused += 1
+                return
+            self.new += 1
+            self.recent[sql] = None
+            if len(self.recent) > self.capacity:
+                self.recent.popitem(last=False)
+    
+    def stats(self):
+        total = self.reused + self.new
+        return {
+            'capacity': self.capacity,
+            'distinct': len(self.recent),
+            'reused': self.reused,
+            'new': self.new,
+            'prepared': self.prepared,
+            'reuse_rate': round(self.reused / total, 4) if total else 0.0,
+        }
+
+class QueryCache:
+    """🗃️ ذاكرة النتائج - Query result cache
+
+    Read results in a bounded LRU with a TTL, keyed by SQL text and
+    parameters and indexed by the tables the SQL reads. A write drops the
+    entries of the tables it names; writes naming no table we can parse
+    (or any write while triggers exist) drop everything, and reads of a
+    view are dropped by any write. A generation counter keeps a read that
+    raced a write from storing what it saw.
+    """
+    
+    NAME = r'((?:[\w"`\[\]]+\.)?[\w"`\[\]]+)'
+    READS = re.compile(r'\b(?:FROM|JOIN)\s+' + NAME + r'(?:\s+(?:AS\s+)?\w+)?((?:\s*,\s*'
+                       + NAME + r'(?:\s+(?:AS\s+)?\w+)?)*)', re.IGNORECASE)
+    WRITES = re.compile(r'\b(?:INSERT(?:\s+OR\s+\w+)?\s+INTO|REPLACE\s+INTO|UPDATE(?:\s+OR\s+\w+)?'
+                        r'|DELETE\s+FROM|(?:CREATE|DROP|ALTER)(?:\s+TEMP\w*)?\s+(?:TABLE|VIEW)'
+                        r'(?:\s+IF(?:\s+NOT)?\s+EXISTS)?)\s+' + NAME, re.IGNORECASE)
+    DDL = re.compile(r'\s*(?:CREATE|DROP|ALTER)\b', re.IGNORECASE)
+    VOLATILE = re.compile(r"random(?:blob)?\s*\(|'now'|\bcurrent_(?:time|date|timestamp)\b"
+                          r"|changes\s*\(|last_insert_rowid\s*\(", re.IGNORECASE)
+    
+    def __init__(self, max_entries=1024, ttl=60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()  # key -> (rows, tables, expires)
+        self.by_table = {}  # table -> keys reading it
+        self.lock = threading.Lock()
+        self.views = set()
+        self.triggers = False
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expired = 0
+        self.invalidations = 0
+    
+    @staticmethod
+    def normalize(name):
+        return name.split('.')[-1].strip('"`[]').lower()
+    
+    @classmethod
+    def read_tables(cls, sql):
+        tables = set()
+        for first, rest, _ in cls.READS.findall(sql):
+            tables.add(cls.normalize(first))
+            for name in re.findall(r',\s*' + cls.NAME, rest):
+                tables.add(cls.normalize(name))
+        return tables
+    
+    @classmethod
+    def write_tables(cls, sql):
+        return {cls.normalize(name) for name in cls.WRITES.findall(sql)}
+    
+    @staticmethod
+    def key(sql, params):
+        if params is None:
+            params = ()
+        elif isinstance(params, dict):
+            params = tuple(sorted(params.items()))
+        else:
+            params = tuple(params)
+        try:
+            hash(params)
+        except TypeError:
+            return None
+        return (sql, params)
+    
+    def get(self, key):
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[2] <= now:
+                self.drop(key)
+                self.expired += 1
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+    
+    def put(self, key, rows, generation):
+        sql = key[0]
+        tables = self.read_tables(sql)
+        if not tables or self.VOLATILE.search(sql):
+            return
+        if tables & self.views:
+            tables.add('*')
+        with self.lock:
+            if generation != self.generation:
+                return
+            if key in self.entries:
+                self.drop(key)
+            self.entries[key] = (rows, tables, time.monotonic() + self.ttl)
+            for table in tables:
+                self.by_table.setdefault(table, set()).add(key)
+            while len(self.entries) > self.max_entries:
+                self.drop(next(iter(self.entries)))
+                self.evictions += 1
+    
+    def drop(self, key):
+        _, tables, _ = self.entries.pop(key)
+        for table in tables:
+            keys = self.by_table.get(table)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.by_table[table]
+    
+    def invalidate(self, tables=None):
+        """Drop entries reading any of `tables` (everything if None); returns entries dropped"""
+        with self.lock:
+            self.generation += 1
+            if tables is None:
+                removed = len(self.entries)
+                self.entries.clear()
+                self.by_table.clear()
+            else:
+                stale = set()
+                for table in tables:
+                    stale |= self.by_table.get(self.normalize(table), set())
+                for key in stale:
+                    self.drop(key)
+                removed = len(stale)
+            self.invalidations += removed
+            return removed
+    
+    def invalidate_for(self, sql):
+        tables = self.write_tables(sql)
+        if not tables or self.triggers:
+            return self.invalidate()
+        return self.invalidate(tables | {'*'})
+    
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self.entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0,
+                'evictions': self.evictions,
+                'expired': self.expired,
+                'invalidations': self.invalidations,
+            }
+
+class QueryLog:
+    """🐢 سجل الاستعلامات البطيئة - Query timing and slow query log
+
+    Keeps per-statement totals (count, total and slowest time) for up to
+    MAX_STATEMENTS distinct SQL strings. A statement slower than the
+    threshold is kept with its EXPLAIN QUERY PLAN and, when the log has a
+    path, appended there as a JSON line with the shape of its parameters
+    (types, never values), its time and, the first time that SQL is
+    written, its plan.
+    """
+    
+    MAX_STATEMENTS = 2000
+    MANY = object()  # parameters of an executemany
+    SCAN = re.compile(r'^\s*SCAN (?:TABLE )?(\S+)(?: AS \S+)?\s*$')
+    
+    def __init__(self, threshold_ms=100, path=None):
+        self.threshold = threshold_ms / 1000 if threshold_ms else None
+        self.path = path
+        self.logged = set()  # SQL whose plan is already in the file at path
+        self.totals = {}  # sql -> [count, total seconds, max seconds, slow count]
+        self.plans = {}  # sql -> plan lines, for statements that were slow
+        self.lock = threading.Lock()
+    
+    @classmethod
+    def shape(cls, params):
+        if params is cls.MANY:
+            return 'many'
+        if isinstance(params, dict):
+            return {key: type(value).__name__ for key, value in params.items()}
+        return [type(value).__name__ for value in params or ()]
+    
+    @staticmethod
+    def null_params(sql):
+        """NULL bindings for the placeholders of `sql`, enough to EXPLAIN it"""
+        bare = re.sub(r"'(?:[^']|'')*'", "''", sql)
+        names = re.findall(r'[:@$](\w+)', bare)
+        if names:
+            return {name: None for name in names}
+        return [None] * bare.count('?')
+    
+    @classmethod
+    def full_scans(cls, plan):
+        """Tables a plan reads in full (SCAN without an index)"""
+        return [match.group(1) for match in map(cls.SCAN.match, plan) if match]
+    
+    def log_to(self, path):
+        """Append slow statements to `path` from now on"""
+        with self.lock:
+            if path != self.path:
+                self.path = path
+                self.logged = set()
+    
+    def record(self, db, sql, params, elapsed):
+        slow = self.threshold is not None and elapsed >= self.threshold
+        with self.lock:
+            totals = self.totals.get(sql)
+            if totals is None:
+                if len(self.totals) >= self.MAX_STATEMENTS and not slow:
+                    return
+                totals = self.totals[sql] = [0, 0.0, 0.0, 0]
+            totals[0] += 1
+            totals[1] += elapsed
+            totals[2] = max(totals[2], elapsed)
+            if not slow:
+                return
+            totals[3] += 1
+            plan = self.plans.get(sql)
+        entry = {'time': datetime.now().isoformat(timespec='seconds'), 'sql': sql,
+                 'params': self.shape(params), 'ms': round(elapsed * 1000, 3)}
+        if plan is None:
+            plan = db.explain(sql, None if params is self.MANY else params)
+            with self.lock:
+                self.plans[sql] = plan
+        if self.path:
+            self.write(entry, plan)
+    
+    def write(self, entry, plan):
+        try:
+            with self.lock:
+                if entry['sql'] not in self.logged:
+                    entry['plan'] = plan
+                line = json.dumps(entry, ensure_ascii=False) + '\n'
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(line)
+                self.logged.add(entry['sql'])
+        except OSError as e:
+            print(f"[Nawa DB] تعذرت كتابة سجل البطء: {e}", file=sys.stderr)
+    
+    def summary(self, top=20):
+        with self.lock:
+            items = sorted(self.totals.items(), key=lambda item: item[1][1], reverse=True)[:top]
+            return [{
+                'sql': sql,
+                'count': count,
+                'total_ms': round(total * 1000, 3),
+                'avg_ms': round(total * 1000 / count, 3),
+                'max_ms': round(longest * 1000, 3),
+                'slow': slow,
+                'full_scans': self.full_scans(self.plans.get(sql, [])),
+            } for sql, (count, total, longest, slow) in items]
+    
+    def slow_statements(self, min_count=2):
+        """SELECTs that were slow at least `min_count` times, with their plans"""
+        with self.lock:
+            return [{'sql': sql, 'count': slow, 'avg_ms': round(total * 1000 / count, 3),
+                     'plan': self.plans.get(sql, [])}
+                    for sql, (count, total, _, slow) in self.totals.items()
+                    if slow >= min_count and Database.is_read(sql)]
+    
+    @classmethod
+    def report(cls, path, top=20):
+        """Aggregate a .slow.jsonl file by SQL, ordered by total time"""
+        totals = {}
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                stats = totals.setdefault(entry['sql'], {'sql': entry['sql'], 'count': 0, 'total_ms': 0.0,
+                                                         'max_ms': 0.0, 'params': entry.get('params'),
+                                                         'plan': []})
+                stats['count'] += 1
+                stats['total_ms'] += entry['ms']
+                stats['max_ms'] = max(stats['max_ms'], entry['ms'])
+                if entry.get('plan'):
+                    stats['plan'] = entry['plan']
+        items = sorted(totals.values(), key=lambda stats: stats['total_ms'], reverse=True)[:top]
+        for stats in items:
+            stats['total_ms'] = round(stats['total_ms'], 3)
+            stats['avg_ms'] = round(stats['total_ms'] / stats['count'], 3)
+            stats['full_scans'] = cls.full_scans(stats['plan'])
+        return items
+
+class IndexAdvisor:
+    """🧭 مستشار الفهارس - Index advisor
+
+    For each slow SELECT whose plan scans a table in full, builds an index
+    from its WHERE and ORDER BY columns: equality columns first, then one
+    range column (or the ORDER BY columns), then, when the select list is
+    a few plain columns, the rest so the index covers the query. Indexes
+    already leading with those columns are reported, not suggested again.
+
+    Each suggestion is verified by creating the index inside a savepoint,
+    re-running EXPLAIN QUERY PLAN and rolling back. The improvement is an
+    estimate of rows read per query: all rows before, rows per distinct
+    key after (a quarter of them for a range alone).
+    """
+    
+    MAX_COLUMNS = 6
+    COLUMN = r'(?:(\w+)\.)?(\w+)'
+    EQUALS = re.compile(COLUMN + r'\s*(?:==?|\bIS\b(?!\s+NOT)|\bIN\b)', re.IGNORECASE)
+    RANGE = re.compile(COLUMN + r'\s*(?:[<>]=?|\bBETWEEN\b|\bLIKE\b|\bGLOB\b)', re.IGNORECASE)
+    WHERE = re.compile(r'\bWHERE\b(.*?)(?:\bGROUP\s+BY\b|\bORDER\s+BY\b|\bLIMIT\b|$)',
+                       re.IGNORECASE | re.DOTALL)
+    ORDER = re.compile(r'\bORDER\s+BY\b(.*?)(?:\bLIMIT\b|$)', re.IGNORECASE | re.DOTALL)
+    SOURCES = re.compile(r'\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?', re.IGNORECASE)
+    SELECTED = re.compile(r'^\s*SELECT\s+(?:DISTINCT\s+)?(.*?)\s+FROM\b', re.IGNORECASE | re.DOTALL)
+    KEYWORDS = {'where', 'join', 'inner', 'left', 'right', 'cross', 'natural', 'outer', 'on',
+                'using', 'group', 'order', 'limit', 'union', 'having', 'window'}
+    
+    def __init__(self, db):
+        self.db = db
+    
+    def query(self, sql, params=()):
+        with self.db.lock:
+            return self.db.conn.execute(sql, params).fetchall()
+    
+    def table_columns(self, table):
+        """(columns, the INTEGER PRIMARY KEY column that aliases the rowid or None)"""
+        info = self.query(f'PRAGMA table_info("{table}")')
+        keys = [row for row in info if row[5]]
+        rowid = keys[0][1] if len(keys) == 1 and keys[0][2].upper() == 'INTEGER' else None
+        return [row[1] for row in info], rowid
+    
+    def indexes(self, table):
+        """{index name: [columns]} of `table`"""
+        return {name: [row[2] for row in self.query(f'PRAGMA index_info("{name}")')]
+                for _, name, *_ in self.query(f'PRAGMA index_list("{table}")')}
+    
+    def sources(self, sql):
+        """{name or alias: table} of the FROM/JOIN clauses"""
+        names = {}
+        for table, alias in self.SOURCES.findall(sql):
+            names[table.lower()] = table
+            if alias and alias.lower() not in self.KEYWORDS:
+                names[alias.lower()] = table
+        return names
+    
+    def key_columns(self, sql, scanned, sources, columns, rowid=None):
+        """Index columns for the table `scanned` (a name or alias in the plan)"""
+        known = {column.lower(): column for column in columns}
+        
+        def own(prefix, name):
+            if prefix and sources.get(prefix.lower(), '').lower() != sources.get(scanned.lower(), '').lower():
+                return None
+            return known.get(name.lower())
+        
+        def unique(names):
+            return list(dict.fromkeys(name for name in names if name))
+        
+        where = self.WHERE.search(sql)
+        where = where.group(1) if where else ''
+        equals = unique(own(*match) for match in self.EQUALS.findall(where))
+        ranges = [name for name in unique(own(*match) for match in self.RANGE.findall(where))
+                  if name not in equals]
+        order = []
+        clause = self.ORDER.search(sql)
+        if clause:
+            for term in clause.group(1).split(','):
+                match = re.fullmatch(r'\s*' + self.COLUMN + r'(?:\s+(?:ASC|DESC))?\s*', term, re.IGNORECASE)
+                name = own(*match.groups()) if match else None
+                if name is None:
+                    order = []
+                    break
+                order.append(name)
+        key = equals + (ranges[:1] if ranges else [name for name in order if name not in equals])
+        if not key:
+            return [], equals, ranges
+        # Covering: add what the select list and the other conditions need
+        selected = self.SELECTED.search(sql)
+        extra = []
+        if selected and not re.search(r'(?:^|[,.])\s*\*', selected.group(1)):
+            for term in selected.group(1).split(','):
+                match = re.fullmatch(r'\s*' + self.COLUMN + r'(?:\s+(?:AS\s+)?\w+)?\s*', term, re.IGNORECASE)
+                if match:
+                    extra.append(own(*match.groups()))
+                elif not re.fullmatch(r'\s*COUNT\s*\(\s*\*\s*\)\s*', term, re.IGNORECASE):
+                    extra = None
+                    break
+            if extra is not None:
+                # Every index entry already carries the rowid
+                extra = [name for name in unique(extra + ranges[1:] + order) if name not in key + [rowid]]
+                if len(key) + len(extra) <= self.MAX_COLUMNS:
+                    key += extra
+        return key, equals, ranges
+    
+    def estimate(self, table, equals, ranges):
+        """(rows read by a full scan, rows read through the index)"""
+        total = self.query(f'SELECT COUNT(*) FROM "{table}"')[0][0]
+        if equals:
+            listed = ', '.join(f'"{name}"' for name in equals)
+            distinct = self.query(f'SELECT COUNT(*) FROM (SELECT DISTINCT {listed} FROM "{table}")')[0][0]
+            return total, total / max(distinct, 1)
+        if ranges:
+            return total, total / 4
+        return total, total
+    
+    def verify(self, sql, ddl):
+        """The plan of `sql` with the index of `ddl` in place, rolled back after"""
+        with self.db.lock:
+            if not self.db.depth:
+                self.db.flush()
+            self.db.conn.execute("SAVEPOINT nawa_advise")
+            try:
+                self.db.conn.execute(ddl)
+                return self.db.explain(sql)
+            finally:
+                self.db.conn.execute("ROLLBACK TO SAVEPOINT nawa_advise")
+                self.db.conn.execute("RELEASE SAVEPOINT nawa_advise")
+    
+    def advise(self, statements, apply=False):
+        suggestions = {}
+        for statement in statements:
+            sql = statement['sql']
+            if len(re.findall(r'\bSELECT\b', sql, re.IGNORECASE)) != 1 or re.search(r'\bOR\b', sql, re.IGNORECASE):
+                continue  # subqueries and OR need more than one index
+            plan = statement.get('plan') or self.db.explain(sql)
+            sources = self.sources(sql)
+            for scanned in QueryLog.full_scans(plan):
+                table = sources.get(scanned.lower())
+                if table is None:
+                    continue
+                columns, rowid = self.table_columns(table)
+                key, equals, ranges = self.key_columns(sql, scanned, sources, columns, rowid)
+                if not key:
+                    continue
+                name = f"idx_{table}_{'_'.join(key)}".lower()
+                suggestion = {'table': table, 'columns': key, 'index': name, 'sql': sql,
+                              'count': statement.get('count', 0), 'avg_ms': statement.get('avg_ms'),
+                              'plan_before': plan, 'applied': False}
+                existing = [index for index, indexed in self.indexes(table).items()
+                            if [c.lower() for c in indexed[:len(key)]] == [c.lower() for c in key]]
+                if existing:
+                    suggestion.update(existing=existing[0], verified=False, plan_after=self.db.explain(sql))
+                    suggestions.setdefault((table, name), suggestion)
+                    continue
+                listed = ', '.join(f'"{column}"' for column in key)
+                ddl = f'CREATE INDEX IF NOT EXISTS "{name}" ON "{table}" ({listed})'
+                plan_after = self.verify(sql, ddl)
+                before, after = self.estimate(table, equals, ranges)
+                suggestion.update(
+                    ddl=ddl, plan_after=plan_after,
+                    verified=scanned not in QueryLog.full_scans(plan_after),
+                    rows_before=before, rows_after=round(after, 1),
+                    improvement=round(before / max(after, 1), 1),
+                    sort_removed=any('TEMP B-TREE' in line for line in plan)
+                    and not any('TEMP B-TREE' in line for line in plan_after),
+                )
+                # An empty table gives no estimate to scale the measured time by
+                if suggestion['avg_ms'] is not None and suggestion['improvement']:
+                    suggestion['estimated_ms'] = round(suggestion['avg_ms'] / suggestion['improvement'], 3)
+                previous = suggestions.get((table, name))
+                if previous is not None:
+                    suggestion['count'] += previous['count']
+                suggestions[(table, name)] = suggestion
+        results = sorted(suggestions.values(), key=lambda item: item['count'], reverse=True)
+        if apply:
+            for suggestion in results:
+                if suggestion.get('verified'):
+                    self.db.execute(suggestion['ddl'])
+                    suggestion['applied'] = True
+        return results
+
+class Statement:
+    """عبارة مجهزة - Prepared statement
+
+    Holds SQL text classified once; each call runs it with new parameters
+    through the connection's statement cache. Callable directly, or with
+    execute()/نفذ, execute_many()/نفذ_دفعة and query()/استعلم.
+    """
+    
+    def __init__(self, db, sql):
+        self.db = db
+        self.sql = sql
+        self.is_read = Database.is_read(sql)
+        self.calls = 0
+    
+    def execute(self, params=None):
+        self.calls += 1
+        self.db.statements.prepared += 1
+        return self.db.execute_as(self.sql, self.is_read, params)
+    
+    def execute_many(self, rows):
+        self.calls += 1
+        return self.db.execute_many(self.sql, rows)
+    
+    def query(self, params=None, arraysize=1000):
+        self.calls += 1
+        return self.db.query(self.sql, params, arraysize)
+    
+    def __call__(self, *params):
+        if len(params) == 1 and isinstance(params[0], (list, tuple, dict)):
+            params = params[0]
+        return self.execute(list(params) if isinstance(params, tuple) else params)
+    
+    def نفذ(self, params=None):
+        return self.execute(params)
+    
+    def نفذ_دفعة(self, rows):
+        return self.execute_many(rows)
+    
+    def استعلم(self, params=None, حجم_الدفعة=1000):
+        return self.query(params, حجم_الدفعة)
+    
+    def __repr__(self):
+        return f"<عبارة {self.sql!r}>"
+
 class FileSystem:
     """📁 نظام الملفات - File System"""
     
@@ -657,6 +4123,77 @@ class HTTPClient:
         except Exception as e:
             return {'status': 500, 'error': str(e)}
     
+    @staticmethod
+    def load_test(url, requests=1000, concurrency=10, method='GET'):
+        """Fire `requests` requests at `url` from `concurrency` keep-alive clients"""
+        import http.client
+        import itertools
+        import urllib.parse
+        
+        parts = urllib.parse.urlsplit(url)
+        target = (parts.path or '/') + (f"?{parts.query}" if parts.query else '')
+        counter = itertools.count()
+        latencies = []
+        statuses = {}
+        lock = threading.Lock()
+        
+        def client():
+            conn = None
+            timings = []
+            counts = {}
+            while next(counter) < requests:
+                start = time.perf_counter()
+                try:
+                    if conn is None:
+                        conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+                    conn.request(method, target)
+                    response = conn.getresponse()
+                    while response.read(65536):
+                        pass
+                    status = str(response.status)
+                    if response.will_close:
+                        conn.close()
+                        conn = None
+                except Exception:
+                    status = 'error'
+                    if conn is not None:
+                        conn.close()
+                        conn = None
+                timings.append(time.perf_counter() - start)
+                counts[status] = counts.get(status, 0) + 1
+            if conn is not None:
+                conn.close()
+            with lock:
+                latencies.extend(timings)
+                for status, count in counts.items():
+                    statuses[status] = statuses.get(status, 0) + count
+        
+        started = time.perf_counter()
+        threads = [threading.Thread(target=client) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        
+        latencies.sort()
+        def percentile(p):
+            if not latencies:
+                return 0
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 3)
+        
+        return {
+            'requests': len(latencies),
+            'seconds': round(elapsed, 3),
+            'rps': round(len(latencies) / elapsed, 1) if elapsed else 0,
+            'status': statuses,
+            'errors': statuses.get('error', 0),
+            'p50_ms': percentile(0.50),
+            'p90_ms': percentile(0.90),
+            'p99_ms': percentile(0.99),
+            'max_ms': percentile(1.0),
+        }
+    
     @staticmethod
     def post(url, data, headers=None):
         import urllib.request
@@ -691,6 +4228,266 @@ class Crypto:
     def sha512(text):
         return hashlib.sha512(text.encode()).hexdigest()
 
+class StringBuilder:
+    """🧱 باني النصوص - String Builder
+
+    يجمع الأجزاء في قائمة ويدمجها مرة واحدة عند الطلب، بدلاً من إنشاء
+    نص جديد عند كل عملية جمع داخل الحلقات.
+    """
+    
+    def __init__(self, initial=''):
+        text = str(initial) if initial else ''
+        self.parts = [text] if text else []
+        self.length = len(text)
+        self._joined = None
+    
+    def append(self, *values):
+        for value in values:
+            text = value if isinstance(value, str) else str(value)
+            self.parts.append(text)
+            self.length += len(text)
+        self._joined = None
+    
+    def join(self):
+        if self._joined is None:
+            self._joined = ''.join(self.parts)
+            self.parts = [self._joined] if self._joined else []
+        return self._joined
+    
+    def clear(self):
+        self.parts = []
+        self.length = 0
+        self._joined = None
+    
+    # Arabic aliases
+    def اضف(self, *values):
+        self.append(*values)
+    
+    def نص(self):
+        return self.join()
+    
+    def امسح(self):
+        self.clear()
+    
+    def __len__(self):
+        return self.length
+    
+    def __str__(self):
+        return self.join()
+
+class Template:
+    """📄 قالب مترجم - Compiled Template
+
+    يترجم القالب مرة واحدة إلى دالة بايثون، ثم يعاد استخدامه لكل طلب.
+
+    الصيغة:
+        {{ مستخدم.اسم }}              قيمة مع تهريب HTML
+        {{! محتوى }}                   قيمة بدون تهريب
+        {% لكل عنصر في عناصر %} ... {% نهاية %}
+        {% اذا شرط %} ... {% والا %} ... {% نهاية %}
+        {% اذا ليس شرط %} ... {% نهاية %}
+    """
+    
+    TAG_RE = re.compile(r'(\{\{.*?\}\}|\{%.*?%\})', re.DOTALL)
+    FOR_WORDS = ('لكل', 'for')
+    IN_WORDS = ('في', 'in')
+    IF_WORDS = ('اذا', 'if')
+    ELSE_WORDS = ('والا', 'else')
+    END_WORDS = ('نهاية', 'end')
+    NOT_WORDS = ('ليس', 'not')
+    
+    CACHE_SIZE = 256
+    _cache = OrderedDict()
+    _cache_lock = threading.Lock()
+    
+    def __init__(self, source, name='<قالب>'):
+        self.source = source
+        self.name = name
+        self.code = self._generate(source)
+        namespace = {}
+        exec(compile(self.code, name, 'exec'), namespace)
+        self._render = namespace['render']
+    
+    # ----- compilation -----
+    
+    def _error(self, message):
+        raise SyntaxError(f"خطأ في القالب {self.name}: {message}")
+    
+    def _path(self, expr, scopes):
+        parts = expr.strip().split('.')
+        if not all(parts):
+            self._error(f"مسار غير صالح: {expr!r}")
+        head, rest = parts[0], tuple(int(p) if p.isdigit() else p for p in parts[1:])
+        if head in scopes:
+            base = scopes[head]
+        else:
+            base = f"_get(ctx, {head!r})"
+        if rest:
+            return f"_path({base}, {rest!r})"
+        return base
+    
+    def _generate(self, source):
+        lines = ["def render(ctx, _get, _path, _esc, _text, _iter):",
+                 "    _out = []",
+                 "    _a = _out.append"]
+        indent = 1
+        scopes = {}
+        stack = []
+        counter = 0
+        
+        for chunk in self.TAG_RE.split(source):
+            if not chunk:
+                continue
+            pad = '    ' * indent
+            if chunk.startswith('{{'):
+                expr = chunk[2:-2]
+                if expr.startswith('!'):
+                    lines.append(f"{pad}_a(_text({self._path(expr[1:], scopes)}))")
+                else:
+                    lines.append(f"{pad}_a(_esc({self._path(expr, scopes)}))")
+            elif chunk.startswith('{%'):
+                words = chunk[2:-2].split()
+                if not words:
+                    self._error("وسم فارغ")
+                keyword = words[0]
+                if keyword in self.FOR_WORDS:
+                    if len(words) != 4 or words[2] not in self.IN_WORDS:
+                        self._error(f"صيغة لكل غير صحيحة: {chunk}")
+                    counter += 1
+                    var = f"_v{counter}"
+                    lines.append(f"{pad}for {var} in _iter({self._path(words[3], scopes)}):")
+                    stack.append(('for', words[1], scopes.get(words[1])))
+                    scopes[words[1]] = var
+                    indent += 1
+                elif keyword in self.IF_WORDS:
+                    negate = len(words) == 3 and words[1] in self.NOT_WORDS
+                    if len(words) != (3 if negate else 2):
+                        self._error(f"صيغة اذا غير صحيحة: {chunk}")
+                    test = self._path(words[-1], scopes)
+                    lines.append(f"{pad}if {'not ' if negate else ''}{test}:")
+                    stack.append(('if', None, None))
+                    indent += 1
+                elif keyword in self.ELSE_WORDS:
+                    if not stack or stack[-1][0] != 'if':
+                        self._error("والا بدون اذا")
+                    stack[-1] = ('else', None, None)
+                    if lines[-1].rstrip().endswith(':'):
+                        lines.append(f"{pad}pass")
+                    lines.append(f"{'    ' * (indent - 1)}else:")
+                elif keyword in self.END_WORDS:
+                    if not stack:
+                        self._error("نهاية بدون بداية")
+                    kind, name, previous = stack.pop()
+                    if kind == 'for':
+                        if previous is None:
+                            del scopes[name]
+                        else:
+                            scopes[name] = previous
+                    if lines[-1].rstrip().endswith(':'):
+                        lines.append(f"{pad}pass")
+                    indent -= 1
+                else:
+                    self._error(f"وسم غير معروف: {keyword}")
+            else:
+                lines.append(f"{pad}_a({chunk!r})")
+        
+        if stack:
+            self._error("كتلة غير مغلقة، متوقع {% نهاية %}")
+        lines.append("    return ''.join(_out)")
+        return '\n'.join(lines) + '\n'
+    
+    # ----- rendering helpers -----
+    
+    @staticmethod
+    def _get(ctx, key):
+        if isinstance(ctx, dict):
+            return ctx.get(key)
+        return getattr(ctx, key, None)
+    
+    @staticmethod
+    def _path_get(value, keys):
+        for key in keys:
+            if value is None:
+                return None
+            if isinstance(key, int) and isinstance(value, (list, tuple, str)):
+                value = value[key] if -len(value) <= key < len(value) else None
+            elif isinstance(value, dict):
+                value = value.get(key, value.get(str(key)))
+            else:
+                value = getattr(value, str(key), None)
+        return value
+    
+    @staticmethod
+    def _text(value):
+        if value is None:
+            return ''
+        if value is True:
+            return 'صحيح'
+        if value is False:
+            return 'خطأ'
+        return value if isinstance(value, str) else str(value)
+    
+    @staticmethod
+    def _escape(value):
+        return html_escape(Template._text(value), quote=True)
+    
+    @staticmethod
+    def _iter(value):
+        if value is None:
+            return ()
+        if isinstance(value, int):
+            return range(value)
+        if isinstance(value, dict):
+            return value.items()
+        return value
+    
+    def render(self, context=None):
+        return self._render(context or {}, self._get, self._path_get,
+                            self._escape, self._text, self._iter)
+    
+    def اعرض(self, context=None):
+        return self.render(context)
+    
+    # ----- cache -----
+    
+    @classmethod
+    def _cached(cls, key, factory):
+        with cls._cache_lock:
+            template = cls._cache.get(key)
+            if template is not None:
+                cls._cache.move_to_end(key)
+                return template
+        template = factory()
+        with cls._cache_lock:
+            cls._cache[key] = template
+            while len(cls._cache) > cls.CACHE_SIZE:
+                cls._cache.popitem(last=False)
+        return template
+    
+    @classmethod
+    def from_text(cls, text):
+        if isinstance(text, Template):
+            return text
+        return cls._cached(('text', text), lambda: cls(text))
+    
+    @classmethod
+    def from_file(cls, path):
+        st = os.stat(path)
+        key = ('file', os.path.abspath(path), st.st_mtime_ns, st.st_size)
+        
+        def load():
+            with open(path, 'r', encoding='utf-8') as f:
+                return cls(f.read(), name=path)
+        return cls._cached(key, load)
+    
+    @classmethod
+    def render_text(cls, template, context=None):
+        return cls.from_text(template).render(context)
+    
+    @classmethod
+    def render_file(cls, path, context=None):
+        return cls.from_file(path).render(context)
+
 # ============================================================================
 # مكتبة نواة القياسية (Nawa Standard Library Functions)
 # ============================================================================
@@ -709,14 +4506,26 @@ NAWA_LIBRARY = {
     'مجموع': sum,
     'فرز': sorted,
     'عكس': lambda x: list(reversed(x)) if isinstance(x, list) else -x,
+    'باني_نص': StringBuilder,
     
     # ===== Web Functions =====
-    'خادم_ويب': lambda port=8080: WebServer(port),
-    'html': lambda content: {'type': 'html', 'content': content},
-    'رد_جسون': lambda data: {'type': 'json', 'content': json.dumps(data, ensure_ascii=False)},
+    'خادم_ويب': lambda port=8080, عمال=0, طابور=0, محرك='threads': WebServer(port, workers=عمال, queue_size=طابور, engine=محرك),
+    'html': lambda content, نسخة=None, اخر_تعديل=None: WebServer.make_response('html', content, نسخة, اخر_تعديل),
+    'رد_جسون': lambda data, نسخة=None, اخر_تعديل=None: WebServer.make_response('json', data, نسخة, اخر_تعديل),
+    'بث': lambda مصدر, نوع='text/plain; charset=utf-8': WebServer.stream_response(مصدر, نوع),
+    'احداث': WebServer.events_response,
+    'الطلب_الحالي': WebServer.current_request,
+    'مقاييس_الخادم': lambda خادم, نسب=(50, 90, 99): خادم.metrics_snapshot(نسب),
+    'قالب': Template.from_text,
+    'قالب_ملف': Template.from_file,
+    'اعرض_قالب': Template.render_text,
+    'اعرض_قالب_ملف': Template.render_file,
     
     # ===== Database Functions =====
-    'قاعدة_بيانات': lambda name='nawa.db': Database(name),
+    'قاعدة_بيانات': lambda name='nawa.db', دفعة=0, مهلة=0, اتصالات=8, ملف_أداء=None, عبارات=256,
+                           حد_البطء=100, سجل_البطء=None: Database(name, دفعة, مهلة, اتصالات,
+                                                                  profile=ملف_أداء, statement_cache=عبارات,
+                                                                  slow_ms=حد_البطء, slow_path=سجل_البطء),
     
     # ===== File System Functions =====
     'اقرا_ملف': FileSystem.read,
@@ -733,6 +4542,7 @@ NAWA_LIBRARY = {
     # ===== HTTP Functions =====
     'http_جلب': HTTPClient.get,
     'http_ارسل': HTTPClient.post,
+    'اختبار_حمل': lambda url, عدد=1000, تزامن=10: HTTPClient.load_test(url, عدد, تزامن),
     
     # ===== Crypto Functions =====
     'هاش_مد5': Crypto.md5,
@@ -746,11 +4556,14 @@ NAWA_LIBRARY = {
     # ===== Time Functions =====
     'وقت_الآن': lambda: datetime.now().isoformat(),
     'تاريخ_الآن': lambda: datetime.now().strftime('%Y-%m-%d'),
+    'وقت_دقيق': time.perf_counter,
+    'نم': time.sleep,
     
     # ===== System Functions =====
     'نظام': os.name,
     'مسار_عمل': os.getcwd,
     'تغيير_مسار': os.chdir,
+    'ذاكرة_العملية': process_memory,
 }
 
 # ============================================================================
@@ -835,6 +4648,7 @@ class FunctionDefNode(ASTNode):
 class CallNode(ASTNode):
     function: ASTNode
     arguments: List[ASTNode]
+    keywords: Dict[str, ASTNode] = field(default_factory=dict)
 
 @dataclass
 class ReturnNode(ASTNode):
@@ -900,6 +4714,13 @@ class Parser:
             raise SyntaxError(f"خطأ: متوقع {token_type} لكن وجد {self.current().type} في السطر {self.current().line}")
         return self.advance()
     
+    def expect_property_name(self) -> Token:
+        # Keywords such as `نص` or `رابط` are valid method names after a dot
+        token = self.current()
+        if token.type != TokenType.ARABIC_IDENTIFIER and token.value not in KEYWORDS:
+            raise SyntaxError(f"خطأ: متوقع اسم خاصية لكن وجد {token.type} في السطر {token.line}")
+        return self.advance()
+    
     def match(self, *token_types: TokenType) -> bool:
         return self.current().type in token_types
     
@@ -1096,6 +4917,13 @@ class Parser:
         
         return ReturnNode(value)
     
+    COMPOUND_ASSIGN = {
+        TokenType.PLUS_EQUALS: '+',
+        TokenType.MINUS_EQUALS: '-',
+        TokenType.MULTIPLY_EQUALS: '*',
+        TokenType.DIVIDE_EQUALS: '/',
+    }
+    
     def parse_expression_statement(self) -> ASTNode:
         if self.match(TokenType.ARABIC_IDENTIFIER) and self.peek(1).type == TokenType.EQUALS:
             name = self.advance().value
@@ -1104,6 +4932,14 @@ class Parser:
             value = self.parse_expression()
             return AssignNode(name, value)
         
+        # x += y  =>  x = x + y
+        if self.match(TokenType.ARABIC_IDENTIFIER) and self.peek(1).type in self.COMPOUND_ASSIGN:
+            name = self.advance().value
+            op = self.COMPOUND_ASSIGN[self.advance().type]
+            self.skip_newlines()
+            value = self.parse_expression()
+            return AssignNode(name, BinaryOpNode(IdentifierNode(name), op, value))
+        
         expr = self.parse_expression()
         return expr
     
@@ -1188,6 +5024,31 @@ class Parser:
         
         return self.parse_primary()
     
+    def parse_arguments(self):
+        """Parse `(a, b, اسم=قيمة)` into positional and keyword arguments"""
+        self.expect(TokenType.LEFT_PAREN)
+        args = []
+        keywords = {}
+        self.skip_newlines()
+        
+        while not self.match(TokenType.RIGHT_PAREN):
+            if self.match(TokenType.ARABIC_IDENTIFIER) and self.peek(1).type == TokenType.EQUALS:
+                key = self.advance().value
+                self.advance()
+                self.skip_newlines()
+                keywords[key] = self.parse_expression()
+            else:
+                if keywords:
+                    raise SyntaxError(f"خطأ: معامل موضعي بعد معامل مسمى في السطر {self.current().line}")
+                args.append(self.parse_expression())
+            self.skip_newlines()
+            if self.match(TokenType.COMMA):
+                self.advance()
+                self.skip_newlines()
+        
+        self.expect(TokenType.RIGHT_PAREN)
+        return args, keywords
+    
     def parse_primary(self) -> ASTNode:
         if self.match(TokenType.NUMBER):
             return NumberNode(self.advance().value)
@@ -1213,41 +5074,19 @@ class Parser:
             # Property access
             if self.match(TokenType.DOT):
                 self.advance()
-                prop = self.expect(TokenType.ARABIC_IDENTIFIER).value
+                prop = self.expect_property_name().value
                 
                 # Check for method call
                 if self.match(TokenType.LEFT_PAREN):
-                    self.advance()
-                    args = []
-                    self.skip_newlines()
-                    
-                    while not self.match(TokenType.RIGHT_PAREN):
-                        args.append(self.parse_expression())
-                        self.skip_newlines()
-                        if self.match(TokenType.COMMA):
-                            self.advance()
-                            self.skip_newlines()
-                    
-                    self.expect(TokenType.RIGHT_PAREN)
-                    return CallNode(PropertyAccessNode(IdentifierNode(name), prop), args)
+                    args, keywords = self.parse_arguments()
+                    return CallNode(PropertyAccessNode(IdentifierNode(name), prop), args, keywords)
                 
                 return PropertyAccessNode(IdentifierNode(name), prop)
 
             # Function call
             if self.match(TokenType.LEFT_PAREN):
-                self.advance()
-                args = []
-                self.skip_newlines()
-                
-                while not self.match(TokenType.RIGHT_PAREN):
-                    args.append(self.parse_expression())
-                    self.skip_newlines()
-                    if self.match(TokenType.COMMA):
-                        self.advance()
-                        self.skip_newlines()
-                
-                self.expect(TokenType.RIGHT_PAREN)
-                return CallNode(IdentifierNode(name), args)
+                args, keywords = self.parse_arguments()
+                return CallNode(IdentifierNode(name), args, keywords)
             
             # Array indexing
             if self.match(TokenType.LEFT_BRACKET):
@@ -1319,12 +5158,77 @@ class BreakException(Exception):
 class ContinueException(Exception):
     pass
 
+class NawaFunction:
+    """دالة نواة قابلة للاستدعاء من بايثون - Nawa function callable from Python
+
+    Wraps a FunctionDefNode passed to a library function (a route handler,
+    a callback) so Python code can call it like any other callable.
+    """
+    
+    def __init__(self, interpreter: 'Interpreter', node: FunctionDefNode):
+        self.interpreter = interpreter
+        self.node = node
+    
+    @property
+    def name(self) -> str:
+        return self.node.name
+    
+    @property
+    def arity(self) -> int:
+        return len(self.node.params)
+    
+    def __call__(self, *args, **kwargs):
+        return self.interpreter.call_threadsafe(self.node, list(args), kwargs)
+    
+    def __repr__(self):
+        return f"<دالة نواة {self.node.name}>"
+
 class Interpreter:
     def __init__(self):
         self.variables: Dict[str, Any] = {}
         self.constants: set = set()
         self.functions: Dict[str, FunctionDefNode] = {}
         self.builtins = NAWA_LIBRARY.copy()
+        self.source_path: Optional[str] = None
+        self.thread_id = threading.get_ident()
+        self.call_depth = 0
+        self._local = threading.local()
+    
+    def for_thread(self) -> 'Interpreter':
+        """Interpreter to run Nawa code on the calling thread.
+
+        Other threads (web server workers) get their own interpreter that
+        shares this one's globals dict, functions, constants and builtins.
+        Each call made from a worker starts with an empty locals dict
+        chained over the shared globals: it reads the current module-level
+        values, and its assignments stay local to the call, as they do for
+        any Nawa function, so concurrent calls never see each other's
+        locals.
+        """
+        if threading.get_ident() == self.thread_id:
+            return self
+        worker = getattr(self._local, 'interpreter', None)
+        if worker is None:
+            worker = Interpreter.__new__(Interpreter)
+            worker.constants = self.constants
+            worker.functions = self.functions
+            worker.builtins = self.builtins
+            worker.source_path = self.source_path
+            worker.thread_id = threading.get_ident()
+            worker.call_depth = 0
+            worker._local = self._local
+            self._local.interpreter = worker
+        if worker.call_depth == 0:
+            worker.variables = ChainMap({}, self.variables)
+        return worker
+    
+    def call_threadsafe(self, func: FunctionDefNode, args: List[Any], kwargs: Optional[Dict[str, Any]] = None) -> Any:
+        interpreter = self.for_thread()
+        interpreter.call_depth += 1
+        try:
+            return interpreter.call_function(func, args, kwargs)
+        finally:
+            interpreter.call_depth -= 1
     
     def error(self, message: str, line: int = 0):
         raise InterpreterError(f"خطأ: {message}")
@@ -1459,10 +5363,46 @@ class Interpreter:
         if node.name in self.constants:
             self.error(f"لا يمكن تعديل الثابت: {node.name}")
         
+        if isinstance(node.value, BinaryOpNode) and node.value.operator == '+':
+            parts = self.concat_parts(node.name, node.value)
+            if parts is not None:
+                return self.execute_append(node.name, parts)
+        
         value = self.interpret(node.value)
         self.variables[node.name] = value
         return value
     
+    def concat_parts(self, name: str, node: BinaryOpNode) -> Optional[List[ASTNode]]:
+        """Right-hand operands of `x = x + a + b ...`, or None for other shapes."""
+        parts = []
+        while isinstance(node, BinaryOpNode) and node.operator == '+':
+            parts.append(node.right)
+            node = node.left
+        if isinstance(node, IdentifierNode) and node.name == name and name in self.variables:
+            parts.reverse()
+            return parts
+        return None
+    
+    def execute_append(self, name: str, parts: List[ASTNode]) -> Any:
+        # Appending to a string held only by the variable table lets CPython
+        # grow it in place instead of copying the whole string every iteration.
+        current = self.variables[name]
+        values = [self.interpret(part) for part in parts]
+        
+        if isinstance(current, str) and all(isinstance(v, str) for v in values):
+            # A worker's pop only reaches its locals; a global keeps its copy
+            value = self.variables.pop(name, current)
+            del current
+            value += ''.join(values) if len(values) > 1 else values[0]
+            self.variables[name] = value
+            return value
+        
+        value = current
+        for v in values:
+            value = value + v
+        self.variables[name] = value
+        return value
+    
     def execute_var_decl(self, node: VarDeclNode) -> None:
         if node.name in self.variables or node.name in self.constants:
             self.error(f"متغير معرف مسبقاً: {node.name}")
@@ -1513,15 +5453,20 @@ class Interpreter:
         if isinstance(iterable, int):
             iterable = range(iterable)
         
-        for item in iterable:
-            try:
-                self.variables[node.variable] = item
-                for stmt in node.body:
-                    self.interpret(stmt)
-            except ContinueException:
-                continue
-            except BreakException:
-                break
+        try:
+            for item in iterable:
+                try:
+                    self.variables[node.variable] = item
+                    for stmt in node.body:
+                        self.interpret(stmt)
+                except ContinueException:
+                    continue
+                except BreakException:
+                    break
+        finally:
+            # Release lazy sources (query rows, generators) left unfinished
+            if hasattr(iterable, '__next__') and hasattr(iterable, 'close'):
+                iterable.close()
     
     def execute_function_def(self, node: FunctionDefNode) -> None:
         self.functions[node.name] = node
@@ -1529,29 +5474,44 @@ class Interpreter:
     def execute_call(self, node: CallNode) -> Any:
         func = self.interpret(node.function)
         args = [self.interpret(arg) for arg in node.arguments]
+        kwargs = {k: self.interpret(v) for k, v in node.keywords.items()}
         
         # Built-in function
         if callable(func):
-            return func(*args)
+            # Nawa functions passed to the library (route handlers, callbacks)
+            args = [NawaFunction(self, a) if isinstance(a, FunctionDefNode) else a for a in args]
+            for k, v in kwargs.items():
+                if isinstance(v, FunctionDefNode):
+                    kwargs[k] = NawaFunction(self, v)
+            return func(*args, **kwargs)
         
         # User-defined function
         if isinstance(func, FunctionDefNode):
-            old_vars = self.variables.copy()
-            
-            for param, arg in zip(func.params, args):
-                self.variables[param] = arg
-            
-            try:
-                for stmt in func.body:
-                    self.interpret(stmt)
-                return None
-            except ReturnException as e:
-                return e.value
-            finally:
-                self.variables = old_vars
+            return self.call_function(func, args, kwargs)
         
         self.error(f"الكائن ليس دالة قابلة للاستدعاء")
     
+    def call_function(self, func: FunctionDefNode, args: List[Any], kwargs: Optional[Dict[str, Any]] = None) -> Any:
+        old_vars = self.variables.copy()
+        
+        for param, arg in zip(func.params, args):
+            self.variables[param] = arg
+        
+        if kwargs:
+            for key, value in kwargs.items():
+                if key not in func.params:
+                    self.error(f"معامل غير معروف للدالة {func.name}: {key}")
+                self.variables[key] = value
+        
+        try:
+            for stmt in func.body:
+                self.interpret(stmt)
+            return None
+        except ReturnException as e:
+            return e.value
+        finally:
+            self.variables = old_vars
+    
     def evaluate_index(self, node: IndexNode) -> Any:
         collection = self.interpret(node.collection)
         index = self.interpret(node.index)
@@ -1583,7 +5543,94 @@ NAWA_ASCII = """
 ╚═══════════════════════════════════════════════════════════════╝
 """
 
-def run_file(filename: str):
+class HotReloader:
+    """🔁 إعادة التحميل - Hot Reloader
+
+    Polls the script with a cheap os.stat. When its mtime or size changes
+    the file is re-parsed and every function whose definition changed is
+    swapped in, both in interpreter.functions and in the Nawa route
+    handlers of live WebServers; the cached responses of those routes are
+    dropped so the old handler's output is not served again (other routes,
+    and templates, which are keyed by text or by path and mtime, stay
+    warm).
+    Requests already running finish on the node they started with.
+    Top-level statements are not re-run, so new routes or changed globals
+    still need a restart.
+
+    Polling starts once the script's initial run is done (when a server
+    starts serving), in each prefork worker too.
+    """
+    
+    active = []
+    
+    def __init__(self, interpreter: 'Interpreter', path: str, interval: float = 0.5):
+        self.interpreter = interpreter
+        self.path = path
+        self.interval = interval
+        self.signature = self.stat()
+        self.started_pid = None
+        HotReloader.active.append(self)
+    
+    @classmethod
+    def start_all(cls):
+        for reloader in cls.active:
+            reloader.start()
+    
+    def stat(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+    
+    def start(self):
+        # Threads do not survive fork, so each process starts its own
+        if self.started_pid == os.getpid():
+            return
+        self.started_pid = os.getpid()
+        threading.Thread(target=self.run, name='nawa-reloader', daemon=True).start()
+    
+    def run(self):
+        while True:
+            time.sleep(self.interval)
+            signature = self.stat()
+            if signature is None or signature == self.signature:
+                continue
+            self.signature = signature
+            self.reload()
+    
+    def reload(self) -> List[str]:
+        """Swap in changed functions; returns their names"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                source = f.read()
+            program = Parser(Lexer(source).tokenize()).parse()
+        except Exception as e:
+            print(f"🔁 تعذرت إعادة التحميل، يستمر الإصدار الحالي: {e}")
+            return []
+        
+        functions = self.interpreter.functions
+        changed = {}
+        for stmt in program.statements:
+            # AST nodes are dataclasses, so == compares definitions structurally
+            if isinstance(stmt, FunctionDefNode) and functions.get(stmt.name) != stmt:
+                changed[stmt.name] = stmt
+        if not changed:
+            return []
+        
+        for name, node in changed.items():
+            functions[name] = node
+        for server in list(WebServer.instances):
+            for route in list(server.routes.values()):
+                handler = route.handler
+                if (isinstance(handler, NawaFunction) and handler.interpreter.functions is functions
+                        and handler.name in changed):
+                    handler.node = changed[handler.name]
+                    server.cache.invalidate(route.path)
+        print(f"🔁 أعيد تحميل: {', '.join(changed)}")
+        return list(changed)
+
+def run_file(filename: str, watch: bool = False):
     try:
         with open(filename, 'r', encoding='utf-8') as f:
             source = f.read()
@@ -1595,6 +5642,9 @@ def run_file(filename: str):
         ast = parser.parse()
         
         interpreter = Interpreter()
+        interpreter.source_path = os.path.abspath(filename)
+        if watch:
+            HotReloader(interpreter, interpreter.source_path)
         interpreter.interpret(ast)
     
     except FileNotFoundError:
@@ -1604,6 +5654,60 @@ def run_file(filename: str):
         print(f"خطأ: {e}")
         sys.exit(1)
 
+def db_report(path: str, top: int = 20, advise: bool = False, apply: bool = False):
+    """Print the slowest statements recorded for a database (or its .slow.jsonl)"""
+    log_path = path if path.endswith('.slow.jsonl') else f"{path}.slow.jsonl"
+    if not os.path.exists(log_path):
+        print(f"لا يوجد سجل استعلامات بطيئة: {log_path}")
+        print(f"فعّله بـ قاعدة.سجل_البطء(100, '{log_path}') أو قاعدة_بيانات(..., سجل_البطء='{log_path}')")
+        return
+    if advise:
+        db_advise(log_path[:-len('.slow.jsonl')], log_path, apply)
+        return
+    items = QueryLog.report(log_path, top)
+    print(f"🐢 أبطأ الاستعلامات في {log_path} (حسب الزمن الكلي)\n")
+    for rank, stats in enumerate(items, 1):
+        print(f"{rank}. {stats['sql']}")
+        print(f"   المرات: {stats['count']}  الكلي: {stats['total_ms']}ms  "
+              f"المتوسط: {stats['avg_ms']}ms  الأقصى: {stats['max_ms']}ms  المعاملات: {stats['params']}")
+        if stats['full_scans']:
+            print(f"   ⚠️  مسح كامل للجدول: {', '.join(stats['full_scans'])}")
+        for line in stats['plan']:
+            print(f"   | {line}")
+        print()
+    if not items:
+        print("السجل فارغ")
+
+def db_advise(db_path: str, log_path: str, apply: bool = False):
+    """Print (and with `apply` create) indexes for the repeated slow SELECTs of a log"""
+    if not os.path.exists(db_path):
+        print(f"لا توجد قاعدة بيانات: {db_path}")
+        return
+    statements = [stats for stats in QueryLog.report(log_path, QueryLog.MAX_STATEMENTS)
+                  if stats['count'] >= 2 and Database.is_read(stats['sql'])]
+    db = Database(db_path, pool_size=0, slow_ms=0)
+    try:
+        suggestions = db.advise(apply, statements=statements)
+    finally:
+        db.close()
+    print(f"🧭 اقتراحات الفهارس لـ {db_path}\n")
+    for suggestion in suggestions:
+        print(f"• {suggestion['sql']}")
+        print(f"   المرات البطيئة: {suggestion['count']}  المتوسط: {suggestion['avg_ms']}ms")
+        if suggestion.get('existing'):
+            print(f"   ✓ يوجد فهرس: {suggestion['existing']}")
+            continue
+        state = "أنشئ" if suggestion['applied'] else ("مقترح" if suggestion['verified'] else "لم يغير الخطة")
+        print(f"   {state}: {suggestion['ddl']}")
+        estimate = f"، ~{suggestion['estimated_ms']}ms" if 'estimated_ms' in suggestion else ''
+        print(f"   الصفوف المقروءة: {suggestion['rows_before']} ← {suggestion['rows_after']}  "
+              f"(تحسن تقديري ×{suggestion['improvement']}{estimate})")
+        for line in suggestion['plan_after']:
+            print(f"   | {line}")
+        print()
+    if not suggestions:
+        print("لا توجد استعلامات متكررة بمسح كامل")
+
 def repl():
     interpreter = Interpreter()
     print(NAWA_ASCII)
@@ -1646,13 +5750,28 @@ def main():
     -v, --version    عرض الإصدار
     -h, --help       عرض هذه المساعدة
     -r, --repl       تشغيل الوضع التفاعلي
+    -w, --watch      إعادة تحميل الدوال المعدلة دون إعادة تشغيل الخادم
+    --db-report ق    تقرير الاستعلامات البطيئة لقاعدة البيانات ق (أو ملف .slow.jsonl)
+      --advise       مع --db-report: اقتراح فهارس للاستعلامات المتكررة (--apply لإنشائها)
 
 الأمثلة:
     python nawa.py برنامج.nawa
+    python nawa.py موقع.nawa --watch
+    python nawa.py --db-report app.db
+    python nawa.py --db-report app.db --advise --apply
     python nawa.py -r
 """)
             return
-        run_file(sys.argv[1])
+        if sys.argv[1] == '--db-report':
+            options = sys.argv[2:]
+            paths = [arg for arg in options if not arg.startswith('-') and not arg.isdigit()]
+            counts = [int(arg) for arg in options if arg.isdigit()]
+            if not paths:
+                print("الاستخدام: python nawa.py --db-report app.db [عدد] [--advise [--apply]]")
+                sys.exit(1)
+            db_report(paths[0], counts[0] if counts else 20, '--advise' in options, '--apply' in options)
+            return
+        run_file(sys.argv[1], watch=any(arg in ('-w', '--watch') for arg in sys.argv[2:]))
     else:
         repl()
 
@@ -0,0 +1,18 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import nawa
+
+
+@pytest.fixture
+def run_nawa():
+    """Run Nawa source in a fresh interpreter and return the interpreter"""
+    def run(source):
+        interpreter = nawa.Interpreter()
+        interpreter.interpret(nawa.Parser(nawa.Lexer(source).tokenize()).parse())
+        return interpreter
+    return run
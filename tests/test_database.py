@@ -0,0 +1,330 @@
+import gc
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import nawa
+
+
+def test_rollback_in_one_thread_keeps_another_threads_write(tmp_path):
+    db = nawa.Database(str(tmp_path / 'owned.db'))
+    db.create_table('items', {'name': 'TEXT'})
+    began = threading.Event()
+    written = threading.Event()
+
+    def roll_back():
+        db.begin()
+        db.insert('items', {'name': 'discarded'})
+        began.set()
+        # The other thread's write must wait for this transaction, not join it
+        assert not written.wait(0.2)
+        db.rollback()
+
+    def write():
+        began.wait()
+        db.insert('items', {'name': 'kept'})
+        written.set()
+
+    threads = [threading.Thread(target=roll_back), threading.Thread(target=write)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert written.is_set()
+    assert db.select('items') == [['kept']]
+    assert db.depth == 0 and db.owner is None
+    db.close()
+
+
+def test_execute_many_rows_may_read_from_the_same_database(tmp_path):
+    db = nawa.Database(str(tmp_path / 'copy.db'))
+    db.create_table('source', {'n': 'INTEGER'})
+    db.create_table('target', {'n': 'INTEGER'})
+    db.insert_many('source', [[n] for n in range(5)])
+
+    def rows():
+        for offset in range(5):
+            yield db.execute('SELECT n FROM source LIMIT 1 OFFSET ?', [offset])[0]
+
+    assert db.execute_many('INSERT INTO target VALUES (?)', rows()) == 5
+    assert db.execute('SELECT n FROM target ORDER BY n') == [[n] for n in range(5)]
+    db.close()
+
+
+def test_query_runs_writes_on_the_writer_and_commits_them(tmp_path):
+    path = str(tmp_path / 'query.db')
+    db = nawa.Database(path)
+    db.create_table('items', {'n': 'INTEGER'})
+    db.insert('items', {'n': 1})
+    db.cache_results()
+    assert db.execute('SELECT n FROM items') == [[1]]
+
+    rows = db.query('UPDATE items SET n = n + 1 RETURNING n')
+    assert list(rows) == [[2]]
+
+    # The cached SELECT was invalidated and the write is visible elsewhere
+    assert db.execute('SELECT n FROM items') == [[2]]
+    other = sqlite3.connect(path)
+    assert other.execute('SELECT n FROM items').fetchall() == [(2,)]
+    other.close()
+    db.close()
+
+
+def test_wal_and_the_reader_pool_are_opt_in(tmp_path):
+    db = nawa.Database(str(tmp_path / 'plain.db'))
+    assert db.pragmas()['journal_mode'] == 'delete'
+    assert db.pool is None
+    db.use_profile('safe')
+    assert db.pragmas()['journal_mode'] == 'wal'
+    assert db.pool is not None
+    db.close()
+
+    # WAL persists in the file, so reopening it brings the pool back
+    db = nawa.Database(str(tmp_path / 'plain.db'))
+    assert db.pool is not None
+    db.close()
+
+
+def test_only_the_transaction_owner_reads_through_the_writer(tmp_path):
+    db = nawa.Database(str(tmp_path / 'readers.db'), profile='safe')
+    db.create_table('items', {'name': 'TEXT'})
+    db.begin()
+    db.insert('items', {'name': 'pending'})
+    assert db.execute('SELECT name FROM items') == [['pending']]
+
+    seen = []
+    reader = threading.Thread(target=lambda: seen.append(db.execute('SELECT name FROM items')),
+                              daemon=True)
+    reader.start()
+    # A pooled reader neither waits for the transaction nor sees its writes
+    reader.join(2)
+    assert seen == [[]]
+
+    db.commit()
+    assert db.execute('SELECT name FROM items') == [['pending']]
+    db.close()
+
+
+def test_slow_statements_stay_in_memory_unless_a_log_path_is_given(tmp_path):
+    path = tmp_path / 'slow.db'
+    db = nawa.Database(str(path), slow_ms=0.001)
+    db.create_table('items', {'n': 'INTEGER'})
+    db.execute('SELECT n FROM items')
+    assert db.queries.summary()[0]['slow'] >= 1
+    assert list(tmp_path.iterdir()) == [path]
+
+    log = tmp_path / 'slow.db.slow.jsonl'
+    db.slow_log(0.001, str(log))
+    db.execute('SELECT n FROM items')
+    db.execute('SELECT n FROM items')
+    entries = nawa.QueryLog.report(str(log))
+    assert entries[0]['sql'] == 'SELECT n FROM items' and entries[0]['count'] == 2
+    assert entries[0]['plan']
+    db.close()
+
+
+def test_after_fork_opens_new_connections_and_keeps_the_data(tmp_path):
+    db = nawa.Database(str(tmp_path / 'forked.db'), profile='balanced')
+    db.create_table('items', {'n': 'INTEGER'})
+    db.insert('items', {'n': 1})
+    inherited = db.conn
+    db.after_fork()
+    assert db.conn is not inherited
+    assert nawa.Database.forked[-1][0] is inherited
+    assert db.pragmas()['synchronous'] == 1
+    assert db.execute('SELECT n FROM items') == [[1]]
+    db.close()
+
+
+def test_query_rows_dropped_unclosed_give_their_reader_back(tmp_path, monkeypatch):
+    monkeypatch.setattr(nawa.ConnectionPool, 'WAIT_TIMEOUT', 2)
+    db = nawa.Database(str(tmp_path / 'abandoned.db'), profile='balanced', pool_size=2)
+    db.create_table('items', {'n': 'INTEGER'})
+    db.insert_many('items', [[n] for n in range(10)])
+
+    def abandon():
+        rows = db.query('SELECT n FROM items', arraysize=2)
+        assert rows.اعمدة == ['n']
+
+    abandon()
+    abandon()
+    gc.collect()
+    # Another thread can still get a pooled reader, within the wait timeout
+    with ThreadPoolExecutor(max_workers=1) as worker:
+        assert len(worker.submit(db.execute, 'SELECT n FROM items').result()) == 10
+    stats = db.pool.stats()
+    assert stats['in_use'] == 0 and stats['size'] <= 2
+    assert db.pool.holders == {}
+    db.close()
+
+
+def test_statement_counters_see_every_statement_path(tmp_path):
+    db = nawa.Database(str(tmp_path / 'statements.db'))
+    db.create_table('items', {'n': 'INTEGER'})
+    for n in range(3):
+        db.insert('items', {'n': n})
+    db.execute_many('INSERT INTO items VALUES (?)', [[3], [4]])
+    db.update('items', {'n': 9}, 'n = ?', [0])
+    list(db.query('SELECT n FROM items'))
+    list(db.query('SELECT n FROM items'))
+    find = db.prepare('SELECT n FROM items WHERE n = ?')
+    find(9)
+    find(4)
+
+    stats = db.stats()['statements']
+    # create, insert, executemany, update, select, prepared select
+    assert stats['new'] == 6
+    assert stats['reused'] == 2 + 1 + 1
+    assert stats['prepared'] == 2
+    assert stats['reuse_rate'] == round(4 / 10, 4)
+    db.close()
+
+
+def test_advisor_suggests_and_applies_a_verified_index(tmp_path):
+    db = nawa.Database(str(tmp_path / 'advise.db'))
+    db.execute('CREATE TABLE tasks (id INTEGER PRIMARY KEY, owner TEXT, due INTEGER)')
+    db.execute_many('INSERT INTO tasks (owner, due) VALUES (?, ?)',
+                    [[f'owner{n % 10}', n] for n in range(1000)])
+    sql = 'SELECT id FROM tasks WHERE owner = ? ORDER BY due'
+    statements = [{'sql': sql, 'count': 3, 'avg_ms': 5.0}]
+
+    suggestion, = db.advise(statements=statements)
+    assert suggestion['columns'] == ['owner', 'due'] and suggestion['verified']
+    assert suggestion['improvement'] == 10.0 and suggestion['estimated_ms'] == 0.5
+    assert not suggestion['applied']
+
+    suggestion, = db.advise(apply=True, statements=statements)
+    assert suggestion['applied']
+    assert nawa.QueryLog.full_scans(db.explain(sql)) == []
+    db.close()
+
+
+def test_advisor_handles_an_emptied_table(tmp_path):
+    db = nawa.Database(str(tmp_path / 'empty.db'))
+    db.execute('CREATE TABLE tasks (id INTEGER PRIMARY KEY, owner TEXT)')
+    suggestion, = db.advise(statements=[{'sql': 'SELECT id FROM tasks WHERE owner = ?',
+                                         'count': 3, 'avg_ms': 5.0}])
+    assert suggestion['improvement'] == 0.0 and 'estimated_ms' not in suggestion
+    db.close()
+
+
+def test_db_advise_does_not_create_a_missing_database(tmp_path, capsys):
+    missing = tmp_path / 'missing.db'
+    log = tmp_path / 'missing.db.slow.jsonl'
+    log.write_text('', encoding='utf-8')
+    nawa.db_advise(str(missing), str(log))
+    assert not missing.exists()
+    assert str(missing) in capsys.readouterr().out
+
+
+def cached_db(tmp_path, **options):
+    db = nawa.Database(str(tmp_path / 'cached.db'))
+    db.execute('CREATE TABLE a (n INTEGER)')
+    db.execute('CREATE TABLE b (n INTEGER)')
+    db.execute('INSERT INTO a VALUES (1)')
+    db.execute('INSERT INTO b VALUES (1)')
+    db.cache_results(**options)
+    return db
+
+
+def test_result_cache_drops_only_the_written_tables(tmp_path):
+    db = cached_db(tmp_path)
+    for _ in range(2):
+        assert db.execute('SELECT n FROM a') == [[1]]
+        assert db.execute('SELECT n FROM b') == [[1]]
+    assert db.results.stats()['hits'] == 2
+
+    db.execute('UPDATE a SET n = 2')
+    assert db.execute('SELECT n FROM a') == [[2]]
+    assert db.execute('SELECT n FROM b') == [[1]]
+    stats = db.results.stats()
+    assert stats['hits'] == 3 and stats['invalidations'] == 1
+    db.close()
+
+
+def test_result_cache_follows_views_triggers_and_unparsed_writes(tmp_path):
+    db = cached_db(tmp_path)
+    db.execute('CREATE VIEW doubled AS SELECT n * 2 AS n FROM a')
+    assert db.execute('SELECT n FROM doubled') == [[2]]
+    db.execute('UPDATE a SET n = 5')
+    assert db.execute('SELECT n FROM doubled') == [[10]]
+
+    db.execute('CREATE TRIGGER copy AFTER INSERT ON a BEGIN INSERT INTO b VALUES (NEW.n); END')
+    assert db.execute('SELECT count(*) FROM b') == [[1]]
+    db.execute('INSERT INTO a VALUES (7)')
+    assert db.execute('SELECT count(*) FROM b') == [[2]]
+
+    db.execute('DROP TRIGGER copy')
+    assert db.execute('SELECT count(*) FROM b') == [[2]]
+    db.execute('VACUUM')  # names no table: everything goes
+    assert db.results.stats()['entries'] == 0
+    db.close()
+
+
+def test_result_cache_expires_and_evicts(tmp_path):
+    db = cached_db(tmp_path, max_entries=2, ttl=0.05)
+    for sql in ('SELECT n FROM a', 'SELECT n FROM b', 'SELECT n + 1 FROM a'):
+        db.execute(sql)
+    stats = db.results.stats()
+    assert stats['entries'] == 2 and stats['evictions'] == 1
+    time.sleep(0.06)
+    db.execute('SELECT n FROM b')
+    assert db.results.stats()['expired'] == 1
+    db.close()
+
+
+def test_result_cache_rejects_rows_read_before_a_racing_write():
+    cache = nawa.QueryCache()
+    key = cache.key('SELECT n FROM a', None)
+    generation = cache.generation
+    cache.invalidate_for('UPDATE a SET n = 2')  # lands while the read is running
+    cache.put(key, [(1,)], generation)
+    assert cache.get(key) is None
+    cache.put(key, [(2,)], cache.generation)
+    assert cache.get(key) == [(2,)]
+
+
+def test_profiles_set_writer_and_reader_pragmas_by_english_or_arabic_name(tmp_path):
+    db = nawa.Database(str(tmp_path / 'profiles.db'), profile='تحميل')
+    assert db.profile == 'bulk'
+    pragmas = db.pragmas()
+    assert pragmas['journal_mode'] == 'wal' and pragmas['synchronous'] == 0
+    assert pragmas['cache_size'] == -256000 and pragmas['busy_timeout'] == 30000
+    # Pooled readers share every pragma but the writer-only ones
+    reader = db.pool.acquire()
+    assert reader.execute('PRAGMA cache_size').fetchone()[0] == -256000
+    assert reader.execute('PRAGMA synchronous').fetchone()[0] != 0
+    db.pool.release(reader)
+
+    db.use_profile('safe')
+    assert db.pragmas()['synchronous'] == 2 and db.pragmas()['temp_store'] == 0
+
+    with pytest.raises(ValueError):
+        db.use_profile('fast')
+    assert db.profile == 'safe'
+    db.close()
+
+
+def test_db_report_prints_the_slow_log_of_a_database(tmp_path, capsys):
+    path = str(tmp_path / 'report.db')
+    nawa.db_report(path)
+    assert f'{path}.slow.jsonl' in capsys.readouterr().out
+
+    db = nawa.Database(path, slow_ms=0.001, slow_path=f'{path}.slow.jsonl')
+    db.execute('CREATE TABLE tasks (id INTEGER PRIMARY KEY, owner TEXT)')
+    db.execute_many('INSERT INTO tasks (owner) VALUES (?)', [[f'owner{n}'] for n in range(50)])
+    for n in range(3):
+        db.execute('SELECT id FROM tasks WHERE owner = ?', [f'owner{n}'])
+    db.close()
+
+    nawa.db_report(path, top=5)
+    out = capsys.readouterr().out
+    assert '. SELECT id FROM tasks WHERE owner = ?\n' in out
+    assert 'المرات: 3' in out and 'مسح كامل للجدول: tasks' in out
+
+    nawa.db_report(f'{path}.slow.jsonl', advise=True)
+    assert 'CREATE INDEX' in capsys.readouterr().out
@@ -0,0 +1,412 @@
+import gzip
+import os
+import signal
+import socket
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+import pytest
+
+import nawa
+
+
+def test_handler_returning_page_function_streams_its_pages(run_nawa):
+    interpreter = run_nawa('''
+متغير خادم = خادم_ويب(8099)
+دالة صفحات(ترتيب) {
+    اذا ترتيب >= 3 {
+        ارجع فارغ
+    }
+    ارجع "سطر " + رقم_الى_نص(ترتيب) + "\\n"
+}
+دالة الرئيسية() {
+    ارجع صفحات
+}
+خادم.اربط("/", الرئيسية)
+''')
+    server = interpreter.variables['خادم']
+    status, headers, body = server.dispatch('GET', '/')
+    assert status == 200
+    assert isinstance(body, nawa.StreamBody)
+    assert b''.join(body).decode('utf-8') == 'سطر 0\nسطر 1\nسطر 2\n'
+
+
+def test_streamed_response_holds_its_concurrency_slot_until_closed(run_nawa):
+    interpreter = run_nawa('''
+متغير خادم = خادم_ويب(8099)
+دالة صفحات(ترتيب) {
+    اذا ترتيب >= 2 {
+        ارجع فارغ
+    }
+    ارجع "جزء"
+}
+دالة بطيء() {
+    ارجع بث(صفحات)
+}
+خادم.اربط("/slow", بطيء, حد_التزامن=1)
+''')
+    server = interpreter.variables['خادم']
+    first = server.dispatch('GET', '/slow')
+    assert server.dispatch('GET', '/slow')[0] == 503
+    first[2].close()
+    assert server.dispatch('GET', '/slow')[0] == 200
+
+
+def test_admit_rejects_before_the_body_is_read(run_nawa):
+    interpreter = run_nawa('''
+متغير خادم = خادم_ويب(8099)
+دالة رفع(جسم) {
+    ارجع "ok"
+}
+خادم.اربط("/up", رفع, طرق=["POST"], معدل=1, دفعة=1)
+''')
+    server = interpreter.variables['خادم']
+    assert server.admit('POST', '/up', '1.2.3.4') == (None, None)
+    rejection, slot = server.admit('POST', '/up', '1.2.3.4')
+    assert rejection[0] == 429 and slot is None
+
+
+def test_template_renders_loops_conditions_and_escapes():
+    template = nawa.Template(
+        "{% لكل مهمة في مهام %}<li>{{ مهمة.عنوان }}{% اذا مهمة.منجزة %} ✓{% نهاية %}</li>{% نهاية %}"
+        "{% اذا ليس مهام %}لا شيء{% نهاية %}{{! خام }}")
+    html = template.render({'مهام': [{'عنوان': '<b>', 'منجزة': True}, {'عنوان': 'ب', 'منجزة': False}],
+                            'خام': '<i>'})
+    assert html == '<li>&lt;b&gt; ✓</li><li>ب</li><i>'
+
+
+def test_template_allows_an_empty_if_body_before_else():
+    template = nawa.Template("{% اذا x %}{% والا %}no{% نهاية %}")
+    assert template.render({'x': True}) == ''
+    assert template.render({'x': False}) == 'no'
+
+
+def test_template_reports_unclosed_blocks():
+    with pytest.raises(SyntaxError):
+        nawa.Template("{% اذا x %}yes")
+    with pytest.raises(SyntaxError):
+        nawa.Template("{% والا %}")
+
+
+def test_worker_threads_share_globals_and_keep_their_own_locals(run_nawa):
+    interpreter = run_nawa('''
+متغير الاصدار = 1
+دالة اقرأ(س) {
+    متغير محلي = س
+    الاصدار = الاصدار + س
+    ارجع الاصدار
+}
+''')
+    handler = interpreter.functions['اقرأ']
+    with ThreadPoolExecutor(max_workers=1) as worker:
+        results = [worker.submit(interpreter.call_threadsafe, handler, [10]).result()]
+        # A later module-level change is seen by the same worker's next call
+        interpreter.variables['الاصدار'] = 5
+        results.append(worker.submit(interpreter.call_threadsafe, handler, [1]).result())
+
+    assert results == [11, 6]
+    assert interpreter.variables['الاصدار'] == 5
+    assert 'محلي' not in interpreter.variables
+
+
+class FailingServer:
+    host = 'localhost'
+    port = 0
+    engine = 'threads'
+
+    def serve(self):
+        raise RuntimeError('bind failed')
+
+    def stop(self):
+        pass
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='prefork needs fork()')
+def test_prefork_supervisor_gives_up_on_workers_that_die_at_startup(monkeypatch):
+    monkeypatch.setattr(nawa.PreforkSupervisor, 'RESTART_BACKOFF', 0.01)
+    monkeypatch.setattr(nawa.PreforkSupervisor, 'MAX_FAILURES', 3)
+    handlers = {signum: signal.getsignal(signum) for signum in (signal.SIGTERM, signal.SIGINT)}
+    supervisor = nawa.PreforkSupervisor(FailingServer(), 1)
+    try:
+        with pytest.raises(SystemExit) as stopped:
+            supervisor.run()
+    finally:
+        for signum, handler in handlers.items():
+            signal.signal(signum, handler)
+    assert stopped.value.code == 1
+    assert supervisor.failures == {0: 3}
+
+
+def test_cached_responses_are_keyed_and_invalidated_by_decoded_path(run_nawa):
+    interpreter = run_nawa('''
+متغير خادم = خادم_ويب(8099)
+دالة مقال(معاملات) {
+    ارجع "مقال " + معاملات["رقم_المقال"]
+}
+خادم.اربط("/مقالات/:رقم_المقال", مقال, مدة_التخزين=60)
+''')
+    server = interpreter.variables['خادم']
+    encoded = quote('/مقالات/1')
+    assert server.dispatch('GET', encoded)[1].get('X-Cache') != 'HIT'
+    status, headers, body = server.dispatch('GET', encoded.lower())
+    assert headers['X-Cache'] == 'HIT' and body == 'مقال 1'.encode('utf-8')
+    assert server.dispatch('GET', '/مقالات/1')[1]['X-Cache'] == 'HIT'
+
+    assert server.invalidate('/مقالات/1') == 1
+    assert server.dispatch('GET', encoded)[1].get('X-Cache') != 'HIT'
+    assert server.invalidate('/مقالات/:رقم_المقال') == 1
+    assert nawa.ResponseCache.normalize('/a%2Fb') != nawa.ResponseCache.normalize('/a/b')
+
+
+def test_request_parses_its_parts_once_on_first_access():
+    request = nawa.Request('POST', '/', 'ص=1&ص=2&و=', {'content-type': 'application/json; charset=utf-8'},
+                           '{"اسم": "نواة"}')
+    assert request.query == {'ص': ['1', '2'], 'و': ''}
+    assert request.content_type == 'application/json'
+    assert request.json == {'اسم': 'نواة'}
+    assert request.json is request.json
+    assert 'json' in vars(request)
+    assert isinstance(nawa.Request.json, nawa.lazy_property)
+
+
+def test_access_log_writes_again_after_close(tmp_path):
+    path = tmp_path / 'access.log'
+    log = nawa.AccessLog(str(path), flush_interval=0.01)
+    log.log('GET', '/first', 200, 5, time.perf_counter())
+    log.close()
+    # A second serve() in the same process: the writer thread must run again
+    log.log('GET', '/second', 200, 5, time.perf_counter())
+    deadline = time.monotonic() + 2
+    while log.written < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert log.stats() == {'written': 2, 'dropped': 0, 'pending': 0}
+    log.close()
+    lines = path.read_text(encoding='utf-8').splitlines()
+    assert [line.split()[3] for line in lines] == ['/first', '/second']
+
+
+def test_reload_drops_only_the_cached_responses_of_changed_handlers(tmp_path, run_nawa):
+    source = '''
+متغير خادم = خادم_ويب(8099)
+دالة اولى() {
+    ارجع "v1"
+}
+دالة ثانية() {
+    ارجع "ثابت"
+}
+خادم.اربط("/اولى", اولى, مدة_التخزين=60)
+خادم.اربط("/ثانية", ثانية, مدة_التخزين=60)
+'''
+    script = tmp_path / 'app.nawa'
+    script.write_text(source, encoding='utf-8')
+    interpreter = run_nawa(source)
+    server = interpreter.variables['خادم']
+    reloader = nawa.HotReloader(interpreter, str(script))
+    try:
+        for path in ('/اولى', '/ثانية'):
+            server.dispatch('GET', path)
+        script.write_text(source.replace('"v1"', '"v2"'), encoding='utf-8')
+        assert reloader.reload() == ['اولى']
+
+        status, headers, body = server.dispatch('GET', '/اولى')
+        assert body == b'v2' and headers['X-Cache'] == 'MISS'
+        assert server.dispatch('GET', '/ثانية')[1]['X-Cache'] == 'HIT'
+    finally:
+        nawa.HotReloader.active.remove(reloader)
+
+
+def test_handler_error_rolls_back_its_open_transaction(tmp_path, run_nawa):
+    path = str(tmp_path / 'handler.db').replace('\\', '/')
+    interpreter = run_nawa(f'''
+متغير db = قاعدة_بيانات("{path}")
+db.نفذ("CREATE TABLE items (name TEXT)")
+متغير خادم = خادم_ويب(8099)
+دالة اضف() {{
+    db.ابدأ_معاملة()
+    db.نفذ("INSERT INTO items VALUES ('lost')")
+    ارجع غير_معرف
+}}
+خادم.اربط("/اضف", اضف)
+''')
+    server = interpreter.variables['خادم']
+    db = interpreter.variables['db']
+    with ThreadPoolExecutor(max_workers=1) as worker:
+        status = worker.submit(server.dispatch, 'GET', '/اضف').result()[0]
+    assert status == 500
+    assert db.depth == 0 and db.owner is None
+    # The writer lock was released: another thread can write straight away
+    with ThreadPoolExecutor(max_workers=1) as other:
+        other.submit(db.execute, "INSERT INTO items VALUES ('kept')").result(timeout=2)
+    assert db.execute('SELECT name FROM items') == [['kept']]
+    db.close()
+
+
+def test_router_prefers_static_then_parameter_then_wildcard_segments():
+    router = nawa.Router()
+    for method, path in [('GET', '/users/me'), ('GET', '/users/:id'), ('POST', '/users/:id'),
+                         ('GET', '/files/*path'), ('GET', '/مقالات/:رقم')]:
+        router.add(method, path, (method, path))
+    assert router.match('GET', '/users/me')[0] == ('GET', '/users/me')
+    assert router.match('GET', '/users/42')[:2] == (('GET', '/users/:id'), {'id': '42'})
+    assert router.match('GET', '/files/a/b.txt')[1] == {'path': 'a/b.txt'}
+    assert router.match('GET', quote('/مقالات/٧'))[1] == {'رقم': '٧'}
+    assert router.match('DELETE', '/users/42') == (None, {'id': '42'}, ['GET', 'POST'])
+    assert router.match('GET', '/missing') == (None, None, None)
+
+
+def test_router_rejects_conflicting_parameter_names():
+    router = nawa.Router()
+    router.add('GET', '/users/:id', 'a')
+    with pytest.raises(ValueError):
+        router.add('GET', '/users/:name/posts', 'b')
+
+
+def test_etags_and_conditional_requests():
+    server = nawa.WebServer(8099)
+    server.route('/page', lambda params: 'نص الصفحة')
+    server.route('/versioned', lambda params: server.html('v', 7, 1700000000))
+    server.route('/broken', lambda params: server.html('b', None, 'not a date'))
+
+    status, headers, body = server.dispatch('GET', '/page')
+    etag = headers['ETag']
+    assert status == 200 and etag.startswith('"')
+    assert server.dispatch('GET', '/page', headers={'if-none-match': etag})[0] == 304
+    assert server.dispatch('GET', '/page', headers={'if-none-match': '"other"'})[0] == 200
+
+    status, headers, _ = server.dispatch('GET', '/versioned')
+    assert headers['ETag'] == '"7"' and headers['Last-Modified'] == 'Tue, 14 Nov 2023 22:13:20 GMT'
+    since = {'if-modified-since': 'Wed, 15 Nov 2023 00:00:00 GMT'}
+    assert server.dispatch('GET', '/versioned', headers=since)[0] == 304
+    since = {'if-modified-since': 'Mon, 13 Nov 2023 00:00:00 GMT'}
+    assert server.dispatch('GET', '/versioned', headers=since)[0] == 200
+
+    status, headers, body = server.dispatch('GET', '/broken')
+    assert status == 200 and body == b'b' and 'Last-Modified' not in headers
+
+
+def test_compression_is_negotiated_and_names_its_representation():
+    server = nawa.WebServer(8099)
+    page = 'سطر مكرر\n' * 500
+    server.route('/big', lambda params: page, cache_ttl=60)
+    server.route('/small', lambda params: 'قصير')
+
+    status, headers, body = server.dispatch('GET', '/big', headers={'accept-encoding': 'gzip, deflate'})
+    assert headers['Content-Encoding'] == 'gzip' and headers['Vary'] == 'Accept-Encoding'
+    assert gzip.decompress(body).decode('utf-8') == page
+    assert headers['ETag'].endswith('-gzip"')
+    # The cached entry keeps the encoding, and a 304 carries the same validators
+    again = {'accept-encoding': 'gzip', 'if-none-match': headers['ETag']}
+    status, not_modified, _ = server.dispatch('GET', '/big', headers=again)
+    assert status == 304 and not_modified['ETag'] == headers['ETag']
+
+    status, headers, body = server.dispatch('GET', '/big', headers={'accept-encoding': 'deflate'})
+    assert headers['Content-Encoding'] == 'deflate' and zlib.decompress(body).decode('utf-8') == page
+    status, headers, body = server.dispatch('GET', '/big')
+    assert 'Content-Encoding' not in headers and headers['Vary'] == 'Accept-Encoding'
+    status, headers, body = server.dispatch('GET', '/small', headers={'accept-encoding': 'gzip'})
+    assert 'Content-Encoding' not in headers and body == 'قصير'.encode('utf-8')
+
+
+def test_static_files_serve_ranges_and_stay_inside_their_directory(tmp_path):
+    public = tmp_path / 'public'
+    public.mkdir()
+    (public / 'app.js').write_bytes(b'0123456789')
+    (public / 'index.html').write_bytes(b'<h1>home</h1>')
+    (tmp_path / 'secret.txt').write_bytes(b'secret')
+    server = nawa.WebServer(8099)
+    server.static('/static', str(public))
+    server.route('/static/override.js', lambda params: 'from a route')
+    (public / 'override.js').write_bytes(b'from a file')
+
+    status, headers, body = server.dispatch('GET', '/static/app.js')
+    assert status == 200 and b''.join(body.chunks()) == b'0123456789'
+    assert headers['Accept-Ranges'] == 'bytes' and 'javascript' in headers['Content-Type']
+    assert server.dispatch('GET', '/static/app.js', headers={'if-none-match': headers['ETag']})[0] == 304
+
+    status, headers, body = server.dispatch('GET', '/static/app.js', headers={'range': 'bytes=2-5'})
+    assert status == 206 and headers['Content-Range'] == 'bytes 2-5/10'
+    assert b''.join(body.chunks()) == b'2345'
+    status, _, body = server.dispatch('GET', '/static/app.js', headers={'range': 'bytes=-3'})
+    assert status == 206 and b''.join(body.chunks()) == b'789'
+    assert server.dispatch('GET', '/static/app.js', headers={'range': 'bytes=20-'})[0] == 416
+    # A stale If-Range sends the whole file
+    stale = {'range': 'bytes=2-5', 'if-range': '"old"'}
+    assert server.dispatch('GET', '/static/app.js', headers=stale)[0] == 200
+
+    assert b''.join(server.dispatch('GET', '/static/')[2].chunks()) == b'<h1>home</h1>'
+    assert server.dispatch('GET', '/static/override.js')[2] == b'from a route'
+    assert server.dispatch('GET', '/static/../secret.txt')[0] == 404
+    assert server.dispatch('GET', '/static/%2e%2e/secret.txt')[0] == 404
+    assert server.dispatch('GET', '/static/missing.js')[0] == 404
+
+
+def test_asyncio_engine_keeps_connections_alive_and_answers_pipelined_requests():
+    probe = socket.socket()
+    probe.bind(('localhost', 0))
+    port = probe.getsockname()[1]
+    probe.close()
+    server = nawa.WebServer(port, engine='asyncio')
+    server.banner = False
+    server.access_log = None
+    server.route('/hello/:name', lambda params: f"مرحبا {params['name']}")
+    thread = threading.Thread(target=server.serve, daemon=True)
+    thread.start()
+    for _ in range(50):
+        try:
+            client = socket.create_connection(('localhost', port), timeout=2)
+            break
+        except OSError:
+            time.sleep(0.05)
+
+    with client:
+        client.sendall(b'GET /hello/a HTTP/1.1\r\nHost: x\r\n\r\n'
+                       b'GET /hello/b HTTP/1.1\r\nHost: x\r\n\r\n')
+        received = b''
+        while not received.endswith('مرحبا b'.encode('utf-8')):
+            received += client.recv(4096)
+        first, second = received.split(b'HTTP/1.1 200')[1:]
+        assert b'Connection: keep-alive' in first and first.endswith('مرحبا a'.encode('utf-8'))
+        assert second.endswith('مرحبا b'.encode('utf-8'))
+
+        # The same connection serves a later request, then closes when asked
+        client.sendall(b'GET /hello/c HTTP/1.1\r\nHost: x\r\nConnection: close\r\n\r\n')
+        received = b''
+        while True:
+            chunk = client.recv(4096)
+            if not chunk:
+                break
+            received += chunk
+        assert b'Connection: close' in received and received.endswith('مرحبا c'.encode('utf-8'))
+
+    server.stop()
+    thread.join(5)
+    assert not thread.is_alive()
+
+
+def test_metrics_count_requests_by_route_template_and_status():
+    server = nawa.WebServer(8099)
+    server.route('/users/:id', lambda params: params['id'])
+    assert server.dispatch('GET', '/metrics')[0] == 404
+    server.enable_metrics('/metrics')
+    for n in range(3):
+        server.dispatch('GET', f'/users/{n}')
+    server.dispatch('GET', '/missing')
+
+    snapshot = server.metrics_snapshot()
+    users = snapshot['GET /users/:id']
+    assert users['count'] == 3 and users['status'] == {'2xx': 3} and users['in_flight'] == 0
+    # Before enable_metrics() the endpoint was an ordinary unmatched path
+    assert snapshot['GET -']['status'] == {'4xx': 2}
+    assert users['p50_ms'] <= users['p99_ms']
+
+    status, headers, body = server.dispatch('GET', '/metrics')
+    text = body.decode('utf-8')
+    assert status == 200 and headers['Content-Type'].startswith('text/plain; version=0.0.4')
+    assert 'nawa_http_requests_total{method="GET",route="/users/:id",status="2xx"} 3' in text
+    assert 'nawa_http_request_duration_seconds_bucket{method="GET",route="/users/:id",le="+Inf"} 3' in text
+    assert 'nawa_http_request_duration_seconds_count{method="GET",route="-"} 2' in text
+    # Scrapes are not counted as requests
+    assert 'route="/metrics"' not in text